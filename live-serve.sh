@@ -3,37 +3,19 @@
 # Kill any existing server
 lsof -ti:8888 | xargs kill -9 2>/dev/null || true
 
-# Build the site
-echo "Building static site..."
-python3 src/main.py
-
-# Start server with auto-reload capability
+# Build the site, then keep rebuilding changed pages and reloading the
+# browser until Ctrl+C
 echo "Starting live server on port 8888..."
-cd docs
-
-# Use Python's http.server with auto-reload
-python3 -c "
-import http.server
-import socketserver
-import webbrowser
-import threading
-import time
-
-class Handler(http.server.SimpleHTTPRequestHandler):
-    def end_headers(self):
-        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
-        super().end_headers()
-
-def open_browser():
-    time.sleep(1)
-    webbrowser.open('http://localhost:8888')
-
-threading.Thread(target=open_browser).start()
-
-with socketserver.TCPServer(('', 8888), Handler) as httpd:
-    print('Live server running at http://localhost:8888')
-    print('Press Ctrl+C to stop')
-    httpd.serve_forever()
-"
+python3 src/watch.py --port 8888 &
+WATCH_PID=$!
+
+sleep 2
+if command -v xdg-open >/dev/null 2>&1; then
+    xdg-open http://localhost:8888
+elif command -v wslview >/dev/null 2>&1; then
+    wslview http://localhost:8888
+else
+    echo "Browser not automatically opened. Please visit: http://localhost:8888"
+fi
+
+wait $WATCH_PID
@@ -7,10 +7,10 @@ lsof -ti:8888 | xargs kill -9 2>/dev/null || true
 echo "Building static site..."
 python3 src/main.py
 
-# Start server in background
+# Start server in background (ETags, ranges and precompressed .gz/.br files,
+# as in production)
 echo "Starting server on port 8888..."
-cd docs
-python3 -m http.server 8888 &
+python3 src/serve.py docs --port 8888 &
 SERVER_PID=$!
 
 # Wait a moment for server to start
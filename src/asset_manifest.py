@@ -0,0 +1,87 @@
+import json
+import os
+from build_manifest import hash_bytes, hash_file
+from image_pipeline import hashed_name
+from output_writer import save_json, write_output
+from static_sync import list_files, sync_file
+
+ASSET_CACHE_PATH = os.path.join(".cache", "assets.json")
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+
+class AssetManifest:
+    """
+    Content-hashed names for the files in static/.
+
+    urls maps each file's root-relative URL ("/index.css") to its
+    fingerprinted URL ("/index.0123456789.css"), which changes exactly when
+    the published bytes do, so the fingerprinted copies can be served with
+    far-future cache headers. outputs lists the files fingerprint_assets
+    keeps in the destination dir and written the ones this build wrote.
+    """
+
+    def __init__(self, urls=None):
+        self.urls = urls if urls is not None else {}
+        self.outputs = []
+        self.written = []
+
+    def to_json(self):
+        return json.dumps(self.urls, indent=1, sort_keys=True) + "\n"
+
+def _load_hashes(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fingerprint_assets(static_dir, dest_dir, transforms=None, cache_path=ASSET_CACHE_PATH):
+    """
+    Publish a content-hashed copy of every file under static_dir into
+    dest_dir, next to the plain copy the static sync makes, and write the
+    URL mapping to dest_dir/asset-manifest.json. Files with an entry in
+    transforms (extension -> function of the text, as for sync_dir) are
+    hashed and published transformed. Hashes are kept in cache_path and
+    reused while a file's size and mtime are unchanged, so only new or
+    edited files are read. Returns the AssetManifest.
+    """
+    transforms = transforms or {}
+    previous = _load_hashes(cache_path)
+    hashes = {}
+    assets = AssetManifest()
+    for rel_path in sorted(list_files(static_dir)):
+        src_path = os.path.join(static_dir, rel_path)
+        transform = transforms.get(os.path.splitext(rel_path)[1].lower())
+        stat = os.stat(src_path)
+        key = [stat.st_size, stat.st_mtime_ns, transform.__name__ if transform else None]
+        entry = previous.get(rel_path)
+        text = None
+        if entry is not None and entry[:3] == key:
+            digest = entry[3]
+        elif transform is not None:
+            with open(src_path, 'r', encoding="utf-8") as f:
+                text = transform(f.read())
+            digest = hash_bytes(text.encode("utf-8"))
+        else:
+            digest = hash_file(src_path)
+        hashes[rel_path] = key + [digest]
+
+        hashed_path = hashed_name(rel_path, digest)
+        dst_path = os.path.join(dest_dir, hashed_path)
+        # The name is the content hash, so an existing file is already current
+        if not os.path.exists(dst_path):
+            if transform is None:
+                sync_file(src_path, dst_path)
+            else:
+                if text is None:
+                    with open(src_path, 'r', encoding="utf-8") as f:
+                        text = transform(f.read())
+                write_output(dst_path, text)
+            assets.written.append(hashed_path)
+        assets.outputs.append(hashed_path)
+        assets.urls["/" + rel_path.replace(os.sep, "/")] = "/" + hashed_path.replace(os.sep, "/")
+
+    if write_output(os.path.join(dest_dir, ASSET_MANIFEST_NAME), assets.to_json()):
+        assets.written.append(ASSET_MANIFEST_NAME)
+    assets.outputs.append(ASSET_MANIFEST_NAME)
+    save_json(cache_path, hashes)
+    return assets
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from block_parser import iter_blocks
+from extract_markdown import text_to_textnodes
+from markdown_to_html import markdown_to_html_node, CONVERTER_VERSION
+from synthetic_corpus import generate_markdown, inline_text, write_corpus
+from main import generate_pages_recursive
+
+def time_call(func, repeat):
+    """
+    Run func repeat times and return per-run wall times in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+def summarize(name, times, bytes_processed):
+    best = min(times)
+    return {
+        "name": name,
+        "runs": len(times),
+        "min_s": best,
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "bytes": bytes_processed,
+        "mb_per_s": bytes_processed / best / 1e6 if best else None,
+    }
+
+def parse_block_mix(text):
+    """
+    Parse "paragraph=6,code=1" into {"paragraph": 6, "code": 1}.
+    """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight) if weight else 1.0
+    return mix
+
+def micro_benchmarks(page_size, block_mix, markup_density, repeat, seed=0):
+    """
+    Time each pipeline stage on one synthetic page.
+    """
+    rng = random.Random(seed)
+    markdown = generate_markdown(rng, page_size, block_mix, markup_density)
+    paragraph = inline_text(rng, 200, markup_density)
+    plain_paragraph = inline_text(rng, 200, 0)
+    node = markdown_to_html_node(markdown)
+    html = node.to_html()
+    return [
+        summarize("iter_blocks", time_call(lambda: list(iter_blocks(markdown)), repeat), len(markdown)),
+        summarize("text_to_textnodes", time_call(lambda: text_to_textnodes(paragraph), repeat), len(paragraph)),
+        summarize("text_to_textnodes_plain", time_call(lambda: text_to_textnodes(plain_paragraph), repeat),
+                  len(plain_paragraph)),
+        summarize("markdown_to_html_node", time_call(lambda: markdown_to_html_node(markdown), repeat), len(markdown)),
+        summarize("to_html", time_call(node.to_html, repeat), len(html)),
+    ]
+
+def macro_benchmarks(pages, page_size, block_mix, markup_density, repeat, jobs_list, seed=0):
+    """
+    Time full generate_pages_recursive runs over a synthetic corpus, once per
+    entry in jobs_list.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        dest_dir = os.path.join(root, "docs")
+        template_path = os.path.join(root, "template.html")
+        with open(template_path, 'w') as f:
+            f.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+        corpus_bytes = write_corpus(content_dir, pages, page_size, block_mix, markup_density, seed)
+        for jobs in jobs_list:
+            def build():
+                with redirect_stdout(StringIO()):
+                    generate_pages_recursive(content_dir, template_path, dest_dir, "/", jobs=jobs,
+                                             templates_dir=None)
+            result = summarize(f"build_jobs_{jobs}", time_call(build, repeat), corpus_bytes)
+            result["pages"] = pages
+            result["pages_per_s"] = pages / result["min_s"] if result["min_s"] else None
+            results.append(result)
+    return results
+
+def run(args):
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "converter_version": CONVERTER_VERSION,
+        "params": vars(args),
+        "micro": micro_benchmarks(args.page_size, args.block_mix, args.markup_density,
+                                  args.repeat, args.seed),
+        "macro": macro_benchmarks(args.pages, args.page_size, args.block_mix, args.markup_density,
+                                  args.repeat, args.jobs, args.seed),
+    }
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200, help="pages in the macro benchmark corpus")
+    parser.add_argument("--page-size", type=int, default=8000, help="approximate characters per page")
+    parser.add_argument("--block-mix", type=parse_block_mix, default=None,
+                        help="relative block type weights, e.g. paragraph=6,code=1,quote=1")
+    parser.add_argument("--markup-density", type=float, default=0.1,
+                        help="fraction of words carrying inline markup")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1], help="worker counts for macro runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="write JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
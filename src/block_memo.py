@@ -0,0 +1,77 @@
+from collections import OrderedDict
+
+DEFAULT_MEMO_ENTRIES = 4096
+# Bounds on the text and HTML a memo holds, counted in characters
+DEFAULT_MEMO_BYTES = 2 * 1024 * 1024
+# Blocks bigger than this are rarely repeated and would crowd out the rest
+MAX_BLOCK_BYTES = 16 * 1024
+
+class BlockMemo:
+    """
+    Bounded LRU map from a block's raw text to its rendered HTML fragment,
+    so blocks repeated across pages (disclaimers, pasted footers, shared code
+    samples) are parsed and serialized once. Entries also hold the link and
+    image targets found in the block, which are replayed on a hit. hits and
+    misses count lookups over the memo's lifetime.
+
+    The memo holds at most max_entries entries and max_bytes of their sizes
+    together; an entry larger than max_block_bytes is not kept at all, so a
+    huge page cannot fill the memo with blocks that will never repeat.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMO_ENTRIES, max_bytes=DEFAULT_MEMO_BYTES,
+                 max_block_bytes=MAX_BLOCK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_block_bytes = max_block_bytes
+        # key -> (entry, size)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, entry, size=0):
+        """
+        Remember entry under key. size is what it costs against max_bytes,
+        e.g. the length of the block's text plus its HTML.
+        """
+        if size > self.max_block_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        self.entries[key] = (entry, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def __repr__(self):
+        return (f"BlockMemo({len(self.entries)}/{self.max_entries} entries, {self.bytes} bytes, "
+                f"{self.hits} hits, {self.misses} misses)")
+
+# This process's memo: each worker keeps its own across all the pages it renders
+_process_memo = None
+
+def process_memo(max_entries):
+    """
+    The BlockMemo shared by every page rendered in this process, or None
+    when max_entries is 0.
+    """
+    global _process_memo
+    if not max_entries:
+        return None
+    if _process_memo is None or _process_memo.max_entries != max_entries:
+        _process_memo = BlockMemo(max_entries)
+    return _process_memo
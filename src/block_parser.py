@@ -0,0 +1,109 @@
+from block_types import BlockType
+
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+
+def iter_lines(source):
+    """
+    Yield lines without their line endings from a string or any iterable of
+    lines (such as an open file), without materializing a list of them.
+    """
+    if isinstance(source, str):
+        start = 0
+        while True:
+            end = source.find("\n", start)
+            if end == -1:
+                yield source[start:].rstrip("\r")
+                return
+            yield source[start:end].rstrip("\r")
+            start = end + 1
+    else:
+        for line in source:
+            yield line.rstrip("\r\n")
+
+class _BlockState:
+    """
+    Lines of the block being read plus the running classification checks,
+    updated once per line so no block is ever rescanned.
+    """
+
+    def __init__(self, first_line):
+        self.lines = [first_line]
+        self.all_quote = True
+        self.all_unordered = True
+        self.ordered = True
+        self._check(first_line)
+
+    def _check(self, line):
+        if self.all_quote and line and not line.startswith(">"):
+            self.all_quote = False
+        if self.all_unordered and line and not line.startswith("- "):
+            self.all_unordered = False
+        if self.ordered and not line.startswith(f"{len(self.lines)}. "):
+            self.ordered = False
+
+    def add(self, line):
+        self.lines.append(line)
+        self._check(line)
+
+    def finish(self):
+        lines = self.lines
+        last = lines[-1].rstrip()
+        if last != lines[-1]:
+            # The block ends stripped, so "- " alone is "-", not an empty item
+            lines[-1] = last
+            self._check(last)
+        first = lines[0]
+        if first.startswith(HEADING_PREFIXES):
+            return BlockType.HEADING, lines
+        if self.all_quote:
+            return BlockType.QUOTE, lines
+        if self.all_unordered:
+            return BlockType.UNORDERED_LIST, lines
+        if self.ordered:
+            return BlockType.ORDERED_LIST, lines
+        return BlockType.PARAGRAPH, lines
+
+def iter_blocks(source):
+    """
+    Parse markdown into (BlockType, lines) tuples with a single pass over its
+    lines, yielding each block as soon as it ends.
+
+    Blocks are separated by blank lines, except inside a ``` fenced code
+    block, which runs until its closing fence and may contain blank lines.
+    source is a string or an iterable of lines, e.g. an open file.
+    """
+    state = None
+    fence = None
+    for line in iter_lines(source):
+        if fence is not None:
+            fence.append(line)
+            if line.rstrip().endswith("```"):
+                fence[-1] = fence[-1].rstrip()
+                yield BlockType.CODE, fence
+                fence = None
+            continue
+        if not line.strip():
+            if state is not None:
+                yield state.finish()
+                state = None
+            continue
+        if state is None:
+            line = line.lstrip()
+            if line.startswith("```"):
+                fence = [line]
+                if len(line) > 3 and line.rstrip().endswith("```"):
+                    # ```inline``` on a single line
+                    fence[0] = line.rstrip()
+                    yield BlockType.CODE, fence
+                    fence = None
+                continue
+            state = _BlockState(line)
+        else:
+            state.add(line)
+    if fence is not None:
+        # Unclosed fence: everything up to the end of the file is code
+        while not fence[-1].strip():
+            fence.pop()
+        yield BlockType.CODE, fence
+    if state is not None:
+        yield state.finish()
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+from output_writer import save_json
+
+MANIFEST_VERSION = 2
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class BuildManifest:
+    """
+    On-disk record of the inputs used for the last build.
+
+    pages maps a markdown path (relative to the content dir) to
+    {"hash": <sha256 of the markdown>, "output": <html path relative to dest>,
+    "size", "mtime_ns", "draft"}; the hash is only recomputed when size or
+    mtime_ns change.
+    templates maps each template path to the sha256 of its source. options
+    holds build settings that change every page's HTML.
+    """
+
+    def __init__(self, templates=None, basepath=None, pages=None, options=None):
+        self.templates = templates if templates is not None else {}
+        self.basepath = basepath
+        self.pages = pages if pages is not None else {}
+        self.options = options if options is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        # A missing, unreadable or outdated manifest just means a full build
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(
+            templates=data.get("templates", {}),
+            basepath=data.get("basepath"),
+            pages=data.get("pages", {}),
+            options=data.get("options", {}),
+        )
+
+    def save(self, path):
+        data = {
+            "version": MANIFEST_VERSION,
+            "templates": self.templates,
+            "basepath": self.basepath,
+            "pages": self.pages,
+            "options": self.options,
+        }
+        save_json(path, data)
+
+def remove_file_and_empty_parents(path, stop_dir):
+    """
+    Delete path, then remove any directories left empty up to (not including) stop_dir.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    stop_dir = os.path.abspath(stop_dir)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != stop_dir and parent.startswith(stop_dir):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+from minify import minify_html
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+ROOT_URL_PATTERN = re.compile(r'(href|src)="/')
+ROOT_PATH_PATTERN = re.compile(r'(href|src)="/([^"#?]*)')
+
+def apply_basepath(html, basepath, assets=None):
+    """
+    Point root-relative href/src attributes at basepath in a single scan.
+    assets optionally maps root-relative URLs to fingerprinted ones, which
+    replace them in the same scan.
+    """
+    if assets:
+        return ROOT_PATH_PATTERN.sub(
+            lambda m: f'{m.group(1)}="{basepath}{assets.get("/" + m.group(2), "/" + m.group(2))[1:]}', html)
+    if basepath == "/":
+        return html
+    return ROOT_URL_PATTERN.sub(lambda m: f'{m.group(1)}="{basepath}', html)
+
+def asset_references(html, assets):
+    """
+    The fingerprinted URLs of the assets html refers to, in order.
+    """
+    urls = ("/" + path for attribute, path in ROOT_PATH_PATTERN.findall(html))
+    return [assets[url] for url in urls if url in assets]
+
+class CompiledTemplate:
+    """
+    A page template split once into literal segments and named slots.
+
+    segments alternates literal text (even indexes) and slot names (odd
+    indexes), so rendering is a single join. The basepath is applied to the
+    literals at compile time, together with the fingerprinted asset URLs in
+    assets, and with minify so is minify_html; slot values are inserted as
+    given.
+    """
+
+    def __init__(self, source, basepath="/", path=None, minify=False, assets=None):
+        self.path = path
+        self.basepath = basepath
+        self.assets = assets
+        parts = SLOT_PATTERN.split(source)
+        for i in range(0, len(parts), 2):
+            parts[i] = apply_basepath(parts[i], basepath, assets)
+            if minify:
+                parts[i] = minify_html(parts[i])
+        self.segments = parts
+        self.slots = parts[1::2]
+
+    @classmethod
+    def load(cls, path, basepath="/", minify=False, assets=None):
+        with open(path, 'r') as f:
+            return cls(f.read(), basepath, path, minify, assets)
+
+    def render(self, **values):
+        parts = self.segments[:]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            if name not in values:
+                raise ValueError(f"No value for template slot {{{{ {name} }}}}")
+            parts[i] = values[name]
+        return "".join(parts)
+
+    def render_to(self, write, **values):
+        """
+        Like render, but pass the page to write piece by piece. A value may be
+        a string or an iterable of string chunks, which are written as they
+        are produced rather than joined first (so such a slot should appear
+        only once). Missing slots are reported before anything is written.
+        """
+        for name in self.slots:
+            if name not in values:
+                raise ValueError(f"No value for template slot {{{{ {name} }}}}")
+        for i, part in enumerate(self.segments):
+            if i % 2 == 0:
+                if part:
+                    write(part)
+                continue
+            value = values[part]
+            if isinstance(value, str):
+                write(value)
+            else:
+                for chunk in value:
+                    write(chunk)
+
+    def __repr__(self):
+        return f"CompiledTemplate({self.path}, {self.slots})"
+
+class TemplateSet:
+    """
+    The default template plus optional named templates in templates_dir.
+
+    A page under content/<section>/... uses templates_dir/<section>.html when
+    that file exists and the default template otherwise. Templates are
+    compiled on first use and reused for the rest of the build, minified
+    when minify is set. assets maps root-relative URLs of static files to
+    their fingerprinted URLs.
+    """
+
+    def __init__(self, default_path, basepath="/", templates_dir="templates", minify=False, assets=None):
+        self.default_path = default_path
+        self.basepath = basepath
+        self.templates_dir = templates_dir
+        self.minify = minify
+        self.assets = assets
+        self._compiled = {}
+
+    def named_path(self, name):
+        return os.path.join(self.templates_dir, f"{name}.html")
+
+    def get(self, name=None):
+        path = self.default_path
+        if name is not None and self.templates_dir and os.path.isfile(self.named_path(name)):
+            path = self.named_path(name)
+        if path not in self._compiled:
+            self._compiled[path] = CompiledTemplate.load(path, self.basepath, self.minify, self.assets)
+        return self._compiled[path]
+
+    def for_page(self, rel_md_path, name=None):
+        """
+        Pick the template for a markdown path relative to the content dir, or
+        the named one (from the page's front matter) when given.
+        """
+        if name:
+            return self.get(name)
+        parts = rel_md_path.replace(os.sep, "/").split("/")
+        section = parts[0] if len(parts) > 1 else None
+        return self.get(section)
+
+    def source_paths(self):
+        paths = [self.default_path]
+        if self.templates_dir and os.path.isdir(self.templates_dir):
+            for name in sorted(os.listdir(self.templates_dir)):
+                if name.endswith(".html"):
+                    paths.append(os.path.join(self.templates_dir, name))
+        return paths
+
+    def source_hashes(self):
+        """
+        {template path: sha256 of its source} for every template, so changes
+        to individual templates can be detected. With assets the hash also
+        covers the fingerprinted URLs the template refers to, so a template
+        counts as changed when one of its assets does.
+        """
+        hashes = {}
+        for path in self.source_paths():
+            with open(path, 'rb') as f:
+                source = f.read()
+            h = hashlib.sha256(source)
+            if self.assets:
+                for url in asset_references(source.decode("utf-8"), self.assets):
+                    h.update(url.encode("utf-8"))
+            hashes[path] = h.hexdigest()
+        return hashes
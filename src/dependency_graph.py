@@ -0,0 +1,59 @@
+import json
+import os
+from output_writer import save_json
+
+DEPENDENCIES_PATH = os.path.join(".cache", "dependencies.json")
+
+class DependencyGraph:
+    """
+    Which inputs each output was built from, persisted between builds.
+
+    outputs maps an output path (relative to the destination dir) to the
+    sorted input paths it depends on: its markdown source, its template and
+    the static assets it references. dependents is the reverse index, so
+    affected() costs O(changed paths) rather than O(site). basepath is
+    recorded because it is baked into every output.
+    """
+
+    def __init__(self, basepath=None, outputs=None):
+        self.basepath = basepath
+        self.outputs = {}
+        self.dependents = {}
+        for output, inputs in (outputs or {}).items():
+            self.set_inputs(output, inputs)
+
+    @classmethod
+    def load(cls, path=DEPENDENCIES_PATH):
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            return cls(data["basepath"], data["outputs"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls()
+
+    def save(self, path=DEPENDENCIES_PATH):
+        save_json(path, {"basepath": self.basepath, "outputs": self.outputs})
+
+    def set_inputs(self, output, inputs):
+        self.remove_output(output)
+        inputs = sorted(set(inputs))
+        self.outputs[output] = inputs
+        for input_path in inputs:
+            self.dependents.setdefault(input_path, set()).add(output)
+
+    def remove_output(self, output):
+        for input_path in self.outputs.pop(output, ()):
+            users = self.dependents.get(input_path)
+            if users is not None:
+                users.discard(output)
+                if not users:
+                    del self.dependents[input_path]
+
+    def affected(self, changed_paths):
+        """
+        The outputs that depend on any of changed_paths, sorted.
+        """
+        outputs = set()
+        for path in changed_paths:
+            outputs.update(self.dependents.get(path, ()))
+        return sorted(outputs)
@@ -0,0 +1,108 @@
+import datetime
+import re
+
+FENCE = "---"
+TRUE_VALUES = ("true", "yes", "on", "1")
+SLUG_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+def parse_list(value):
+    """
+    "[a, b]" or "a, b" -> ["a", "b"], without empty or repeated items.
+    """
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    items = []
+    for item in value.split(","):
+        item = _unquote(item.strip())
+        if item and item not in items:
+            items.append(item)
+    return items
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+def parse_fields(lines):
+    """
+    Metadata from front matter lines of "key: value". Keys are lowercased;
+    tags become a list, draft a bool and date an ISO "YYYY-MM-DD" string.
+    Other values are kept as strings. Blank lines and "#" comments are
+    skipped.
+    """
+    metadata = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator or not key.strip():
+            raise ValueError(f"Invalid front matter line: {line}")
+        key = key.strip().lower()
+        value = value.strip()
+        if key == "tags":
+            metadata[key] = parse_list(value)
+        elif key == "draft":
+            metadata[key] = value.lower() in TRUE_VALUES
+        elif key == "date":
+            try:
+                metadata[key] = datetime.date.fromisoformat(_unquote(value)[:10]).isoformat()
+            except ValueError:
+                raise ValueError(f"Invalid front matter date: {value}") from None
+        else:
+            metadata[key] = _unquote(value)
+    return metadata
+
+def parse_front_matter(markdown):
+    """
+    Split markdown into (metadata, body). Front matter is a block of
+    "key: value" lines between two "---" lines at the very start of the
+    file; without one the metadata is {} and the body is markdown itself.
+    """
+    first_end = markdown.find("\n")
+    if first_end == -1 or markdown[:first_end].rstrip("\r") != FENCE:
+        return {}, markdown
+    lines = []
+    start = first_end + 1
+    while True:
+        end = markdown.find("\n", start)
+        line = (markdown[start:] if end == -1 else markdown[start:end]).rstrip("\r")
+        if line == FENCE:
+            return parse_fields(lines), "" if end == -1 else markdown[end + 1:]
+        if end == -1:
+            # Never closed, so it was not front matter
+            return {}, markdown
+        lines.append(line)
+        start = end + 1
+
+def read_front_matter(f):
+    """
+    Read the front matter at the start of an open text file and leave f at
+    the first line of the body. Returns the metadata ({} when there is
+    none, with f back where it started). Only the front matter is read.
+    """
+    start = f.tell()
+    if f.readline().rstrip("\r\n") != FENCE:
+        f.seek(start)
+        return {}
+    lines = []
+    while True:
+        line = f.readline()
+        if not line:
+            f.seek(start)
+            return {}
+        line = line.rstrip("\r\n")
+        if line == FENCE:
+            return parse_fields(lines)
+        lines.append(line)
+
+def read_page_metadata(path):
+    with open(path, 'r') as f:
+        return read_front_matter(f)
+
+def tag_slug(tag):
+    """
+    "Middle-earth Lore" -> "middle-earth-lore", the URL segment of a tag.
+    """
+    return SLUG_SEPARATORS.sub("-", tag.lower()).strip("-")
@@ -1,6 +1,8 @@
 
 
 class HTMLNode:
+    # Slots instead of a per-instance dict: pages allocate a great many nodes
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
@@ -17,8 +19,13 @@ class HTMLNode:
         return " ".join(f'{key}="{value}"' for key, value in self.props.items())
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag=tag, value=value, children=None, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
     def to_html(self):
         if self.value is None:
@@ -31,17 +38,45 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}>{self.value}</{self.tag}>"
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag=tag, value=None, children=children, props=props,)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
-    def to_html(self):
+    def start_tag(self):
         if self.tag is None:
             raise ValueError("ParentNode must have a tag")
         if self.children is None or len(self.children) == 0:
             raise ValueError("ParentNode must have children")
         props_str = self.props_to_html()
-        children_html = "".join(child.to_html() for child in self.children)
         if props_str:
-            return f"<{self.tag} {props_str}>{children_html}</{self.tag}>"
-        return f"<{self.tag}>{children_html}</{self.tag}>"
-        
\ No newline at end of file
+            return f"<{self.tag} {props_str}>"
+        return f"<{self.tag}>"
+
+    def to_html(self):
+        parts = []
+        write_html(self, parts.append)
+        return "".join(parts)
+
+def write_html(node, write):
+    """
+    Serialize node by calling write(str) for each piece of markup, in order.
+
+    Uses an explicit stack instead of recursion, so nesting depth is not
+    limited by the interpreter and no intermediate string is built per level.
+    write can be list.append, io.StringIO.write or a file's write method.
+    """
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            write(item)
+        elif isinstance(item, ParentNode):
+            write(item.start_tag())
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        else:
+            write(item.to_html())
@@ -0,0 +1,236 @@
+import json
+import os
+import re
+import shutil
+import struct
+from build_manifest import hash_file
+from output_writer import save_json
+from parallel_build import build_pages
+from static_sync import list_files
+
+try:
+    from PIL import Image
+except ImportError:
+    # Optional: without Pillow images keep their dimensions and hashed names
+    # but get no resized variants
+    Image = None
+
+IMAGE_CACHE_DIR = os.path.join(".cache", "images")
+# Digests and dimensions of the source images, by relative path
+DIGESTS_NAME = "digests.json"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+DEFAULT_WIDTHS = (480, 960, 1600)
+HASH_LENGTH = 10
+# The <img> tags text_node_to_html_node emits
+IMG_TAG_PATTERN = re.compile(r'<img src="([^"]*)" alt="([^"]*)"')
+
+def _png_size(head):
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+def _gif_size(head):
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    return None
+
+def _webp_size(head):
+    if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    return None
+
+def _jpeg_size(f):
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        # Start of frame markers, excluding DHT, JPG and DAC
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def image_size(path):
+    """
+    (width, height) of a PNG, GIF, WebP or JPEG image read from its header,
+    without decoding it, or None for anything else.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        size = _png_size(head) or _gif_size(head) or _webp_size(head)
+        if size is None and head[:2] == b"\xff\xd8":
+            f.seek(0)
+            size = _jpeg_size(f)
+    return size
+
+def hashed_name(rel_path, digest, suffix=""):
+    """
+    "images/tom.png" -> "images/tom.<hash><suffix>.png".
+    """
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{suffix}{ext}"
+
+def make_variants(src_path, digest, widths, cache_dir=IMAGE_CACHE_DIR):
+    """
+    Resize src_path to each of widths narrower than the original and
+    recompress it, storing the results in cache_dir under the source hash.
+    Variants already in the cache are reused. Returns [(width, height,
+    cached path)]. Needs Pillow.
+    """
+    ext = os.path.splitext(src_path)[1].lower()
+    directory = os.path.join(cache_dir, digest)
+    variants = []
+    with Image.open(src_path) as image:
+        original_width, original_height = image.size
+        for width in widths:
+            if width >= original_width:
+                continue
+            height = round(original_height * width / original_width)
+            cached = os.path.join(directory, f"{width}{ext}")
+            if not os.path.exists(cached):
+                os.makedirs(directory, exist_ok=True)
+                resized = image.resize((width, height), Image.LANCZOS)
+                options = {"quality": 82} if ext in (".jpg", ".jpeg", ".webp") else {"optimize": True}
+                tmp_path = f"{cached}.{os.getpid()}.tmp"
+                resized.save(tmp_path, format=image.format, **options)
+                os.replace(tmp_path, cached)
+                print(f"Resized image: {src_path} to {width}px")
+            variants.append((width, height, cached))
+    return variants
+
+class ImageInfo:
+    __slots__ = ("url", "width", "height", "srcset")
+
+    def __init__(self, url, width=None, height=None, srcset=()):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.srcset = srcset
+
+class ImageSet:
+    """
+    The processed images of a site, keyed by the root-relative URL pages use
+    for the original ("/images/tom.png"). rewrite() points <img> tags at the
+    content-hashed file and adds width, height, srcset and lazy loading.
+    outputs lists the files written into the destination dir.
+    """
+
+    def __init__(self, basepath="/"):
+        self.basepath = basepath
+        self.images = {}
+        self.outputs = []
+
+    def add(self, rel_path, info):
+        self.images["/" + rel_path.replace(os.sep, "/")] = info
+
+    def _attributes(self, match):
+        info = self.images.get(match.group(1))
+        if info is None:
+            return match.group(0)
+        # src gets the basepath from apply_basepath later; srcset does not
+        tag = f'<img src="{info.url}" alt="{match.group(2)}"'
+        if info.width:
+            tag += f' width="{info.width}" height="{info.height}"'
+        if info.srcset:
+            prefix = self.basepath.rstrip("/")
+            candidates = [f"{prefix}{url} {width}w" for url, width in info.srcset]
+            tag += f' srcset="{", ".join(candidates)}" sizes="(max-width: {info.width}px) 100vw, {info.width}px"'
+        return tag + ' loading="lazy"'
+
+    def rewrite(self, html):
+        if not self.images or "<img " not in html:
+            return html
+        return IMG_TAG_PATTERN.sub(self._attributes, html)
+
+def _publish(src_path, dest_dir, rel_path, outputs):
+    dst_path = os.path.join(dest_dir, rel_path)
+    outputs.append(rel_path)
+    if not os.path.exists(dst_path):
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        tmp_path = dst_path + ".tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dst_path)
+
+def process_images(static_dir, dest_dir, basepath="/", widths=DEFAULT_WIDTHS, jobs=1,
+                   cache_dir=IMAGE_CACHE_DIR):
+    """
+    Publish every image under static_dir into dest_dir under a content-hashed
+    name, plus resized variants (made in up to jobs processes and cached in
+    cache_dir, so unchanged images are never reprocessed). Digests and
+    dimensions are kept in cache_dir too and reused while an image's size
+    and mtime are unchanged, so only new or edited images are read.
+    Returns the ImageSet describing them.
+    """
+    images = ImageSet(basepath)
+    digests_path = os.path.join(cache_dir, DIGESTS_NAME)
+    try:
+        with open(digests_path, 'r') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    digests = {}
+    found = []
+    for rel_path in sorted(list_files(static_dir)):
+        if not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        src_path = os.path.join(static_dir, rel_path)
+        stat = os.stat(src_path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        entry = previous.get(rel_path)
+        if entry is None or entry[:2] != key:
+            entry = key + [hash_file(src_path), image_size(src_path)]
+        digests[rel_path] = entry
+        size = tuple(entry[3]) if entry[3] else None
+        found.append((src_path, rel_path, entry[2], size))
+    save_json(digests_path, digests)
+
+    variants = {}
+    if Image is not None and widths:
+        resizable = [(src_path, digest, tuple(widths), cache_dir)
+                     for src_path, rel_path, digest, size in found
+                     if size is not None and size[0] > min(widths)]
+        for args, result in zip(resizable, build_pages(make_variants, resizable, jobs)):
+            variants[args[0]] = result
+    elif found:
+        print("Pillow is not installed: publishing images without resized variants")
+
+    for src_path, rel_path, digest, size in found:
+        url_path = hashed_name(rel_path, digest)
+        _publish(src_path, dest_dir, url_path, images.outputs)
+        srcset = []
+        for width, height, cached in variants.get(src_path, ()):
+            variant_path = hashed_name(rel_path, digest, f"-{width}w")
+            _publish(cached, dest_dir, variant_path, images.outputs)
+            srcset.append(("/" + variant_path.replace(os.sep, "/"), width))
+        if srcset and size:
+            srcset.append(("/" + url_path.replace(os.sep, "/"), size[0]))
+        width, height = size if size else (None, None)
+        images.add(rel_path, ImageInfo("/" + url_path.replace(os.sep, "/"), width, height, srcset))
+    return images
@@ -0,0 +1,100 @@
+import re
+from textnode import TextNode, TextType
+
+# Characters that can start inline markup; everything between them is plain text
+MARKUP_START = re.compile(r"[!\[`*_]")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Text matching none of these ("![" starts with "[") can only be plain text
+INLINE_MARKUP = re.compile(r"[\[_`]|\*\*")
+
+DELIMITERS = (
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+)
+
+def is_plain_text(text):
+    """
+    True when text holds no inline markup at all, found with one scan.
+    """
+    return INLINE_MARKUP.search(text) is None
+
+def _nested(text):
+    """
+    Children for a node whose text may itself contain markup, or None when
+    the text is plain (the common case, which keeps flat nodes flat) or its
+    markup is unbalanced, in which case it stays literal as it always has.
+    """
+    try:
+        children = scan_inline(text)
+    except ValueError:
+        return None
+    if not children or (len(children) == 1 and children[0].text_type == TextType.TEXT):
+        return None
+    return children
+
+def scan_inline(text):
+    """
+    Tokenize inline markdown into TextNodes in a single left-to-right scan.
+
+    Produces the same flat stream as the chained split_nodes_* passes. Bold,
+    italic and link text are scanned recursively, and any markup found inside
+    them is attached to the node as children (e.g. bold inside a link).
+    Code spans are literal. An unmatched delimiter raises ValueError.
+    """
+    nodes = []
+    plain_start = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        m = MARKUP_START.search(text, i)
+        if m is None:
+            break
+        i = m.start()
+        ch = text[i]
+        node = None
+        end = i + 1
+
+        if ch == "!":
+            image = IMAGE_PATTERN.match(text, i)
+            if image:
+                node = TextNode(image.group(1), TextType.IMAGE, image.group(2))
+                end = image.end()
+        elif ch == "[":
+            link = LINK_PATTERN.match(text, i)
+            if link and (i == 0 or text[i - 1] != "!"):
+                anchor = link.group(1)
+                node = TextNode(anchor, TextType.LINK, link.group(2), _nested(anchor))
+                end = link.end()
+        elif ch == "`":
+            close = text.find("`", i + 1)
+            if close == -1:
+                raise ValueError("Invalid Markdown syntax: unmatched delimiter")
+            node = TextNode(text[i + 1:close], TextType.CODE)
+            end = close + 1
+        else:
+            for delimiter, text_type in DELIMITERS:
+                if text.startswith(delimiter, i):
+                    start = i + len(delimiter)
+                    close = text.find(delimiter, start)
+                    if close == -1:
+                        raise ValueError("Invalid Markdown syntax: unmatched delimiter")
+                    inner = text[start:close]
+                    node = TextNode(inner, text_type, None, _nested(inner))
+                    end = close + len(delimiter)
+                    break
+
+        if node is None:
+            # Not markup after all (a lone "!", "[" or "*"): keep scanning
+            i = end
+            continue
+        if plain_start < i:
+            nodes.append(TextNode(text[plain_start:i], TextType.TEXT))
+        # Empty code/bold/italic spans ("``", "****") produce no node, as str.split did
+        if node.text or node.text_type in (TextType.IMAGE, TextType.LINK):
+            nodes.append(node)
+        plain_start = i = end
+
+    if plain_start < n:
+        nodes.append(TextNode(text[plain_start:], TextType.TEXT))
+    return nodes
@@ -0,0 +1,165 @@
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from serve import OutputIndex
+
+def site_paths(directory):
+    """
+    The URL paths a browser would request for an output tree: pages by
+    their directory URL ("/blog/tom/") and every other file as is.
+    Precompressed siblings are left out; they are served by negotiation.
+    """
+    paths = []
+    for path in OutputIndex(directory).paths():
+        if path.endswith("/index.html"):
+            paths.append(path[:-len("index.html")])
+        else:
+            paths.append(path)
+    return paths
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+class LoadResult:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.bytes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def add(self, latencies, statuses, received, errors):
+        with self.lock:
+            self.latencies.extend(latencies)
+            for status, count in statuses.items():
+                self.statuses[status] = self.statuses.get(status, 0) + count
+            self.bytes += received
+            self.errors += errors
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "seconds": elapsed,
+            "requests_per_s": len(latencies) / elapsed if elapsed else None,
+            "mb_per_s": self.bytes / elapsed / 1e6 if elapsed else None,
+            "bytes": self.bytes,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "latency_ms": {
+                "p50": _ms(percentile(latencies, 0.50)),
+                "p90": _ms(percentile(latencies, 0.90)),
+                "p99": _ms(percentile(latencies, 0.99)),
+                "max": _ms(latencies[-1] if latencies else None),
+                "mean": _ms(statistics.fmean(latencies) if latencies else None),
+            },
+        }
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+def _client(host, port, paths, offset, deadline, requests, headers, revalidate, result):
+    """
+    One keep-alive connection requesting paths round-robin, starting at
+    offset, until deadline or until it has made requests requests.
+    """
+    latencies = []
+    statuses = {}
+    received = 0
+    errors = 0
+    etags = {}
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    i = offset
+    try:
+        while time.perf_counter() < deadline and (requests is None or len(latencies) + errors < requests):
+            path = paths[i % len(paths)]
+            i += 1
+            request_headers = dict(headers)
+            if revalidate and path in etags:
+                request_headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            received += len(body)
+            etag = response.getheader("ETag")
+            if etag:
+                etags[path] = etag
+    finally:
+        connection.close()
+        result.add(latencies, statuses, received, errors)
+
+def run_load_test(url, paths, connections=16, duration=10.0, requests=None, accept_encoding="gzip, br",
+                  revalidate=False):
+    """
+    Request paths from the server at url over connections concurrent
+    keep-alive connections for duration seconds (or requests requests per
+    connection), and summarize throughput, status codes and latency
+    percentiles. With revalidate, repeat requests send If-None-Match the
+    way a browser with a warm cache does.
+    """
+    parts = urlsplit(url)
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+    result = LoadResult()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=_client,
+                                args=(parts.hostname, parts.port or 80, paths, n * len(paths) // connections,
+                                      deadline, requests, headers, revalidate, result))
+               for n in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return result.summary(time.perf_counter() - start)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Load-test a server hosting the built site")
+    parser.add_argument("url", nargs="?", default="http://localhost:8888", help="server to test")
+    parser.add_argument("--directory", default="docs", help="output tree whose files are requested")
+    parser.add_argument("--connections", "-c", type=int, default=16, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="seconds to run for")
+    parser.add_argument("--requests", "-n", type=int, default=None,
+                        help="stop each connection after N requests instead")
+    parser.add_argument("--accept-encoding", default="gzip, br",
+                        help='Accept-Encoding to send ("" for identity)')
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send If-None-Match on repeat requests, like a browser with a warm cache")
+    parser.add_argument("--output", "-o", help="write JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    paths = site_paths(args.directory)
+    if not paths:
+        print(f"No files in {args.directory}/", file=sys.stderr)
+        sys.exit(1)
+    duration = args.duration if args.requests is None else float("inf")
+    summary = run_load_test(args.url, paths, args.connections, duration, args.requests,
+                            args.accept_encoding, args.revalidate)
+    summary["paths"] = len(paths)
+    summary["connections"] = args.connections
+    text = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,216 @@
+import argparse
 import os
-import shutil
 import sys
 from textnode import TextNode, TextType
-from markdown_to_html import markdown_to_html_node, extract_title
+from markdown_to_html import iter_markdown_html, extract_title, record_markdown_text, CONVERTER_VERSION
+from build_manifest import BuildManifest, hash_bytes
+from parallel_build import BuildError, build_pages
+from compiled_template import TemplateSet, CompiledTemplate, apply_basepath
+from render_cache import RenderCache, DEFAULT_CACHE_DIR, pack_entry, unpack_entry
+from profiling import BuildProfiler, begin_page, end_page, stage
+from reference_index import (ReferenceIndex, REFERENCES_PATH, begin_collecting, end_collecting, page_url,
+                             record_metadata, record_title, resolve_target, restore_references, snapshot_references)
+from dependency_graph import DependencyGraph, DEPENDENCIES_PATH
+from static_sync import list_files, sync_dir
+from output_writer import OutputChanges, OutputFile, write_output
+from pipelined_build import run_pipeline
+from block_memo import DEFAULT_MEMO_BYTES, DEFAULT_MEMO_ENTRIES, process_memo
+from site_index import SiteIndex, SITE_INDEX_PATH, site_outputs, write_listings, write_site_outputs
+from image_pipeline import process_images
+from minify import minify_css
+from precompress import COMPRESSED_SUFFIXES, precompress_dir
+from asset_manifest import fingerprint_assets
+from front_matter import parse_front_matter, read_front_matter, read_page_metadata
 
-def copy_dir(src, dst):
+MANIFEST_PATH = os.path.join(".cache", "manifest.json")
+# Markdown files larger than this are always streamed, bypassing the render cache
+STREAM_THRESHOLD = 4 * 1024 * 1024
+
+def markdown_to_html(markdown_content, memo=None):
+    return "".join(iter_markdown_html(markdown_content, memo))
+
+def render_page(markdown_content, template, cache=None, memo=None, images=None):
     """
-    Recursively copy all contents from src directory to dst directory.
-    First deletes all contents of dst to ensure a clean copy.
+    Produce the full HTML for a page from its markdown and a CompiledTemplate.
+    Returns (html, cache_hit); cache_hit is None when no RenderCache is given.
+    images is an optional ImageSet to point <img> tags at processed images.
     """
-    if os.path.exists(dst):
-        shutil.rmtree(dst)
-    os.makedirs(dst, exist_ok=True)
-    
-    for item in os.listdir(src):
-        src_path = os.path.join(src, item)
-        dst_path = os.path.join(dst, item)
-        if os.path.isfile(src_path):
-            shutil.copy(src_path, dst_path)
-            print(f"Copied file: {src_path} to {dst_path}")
-        elif os.path.isdir(src_path):
-            copy_dir(src_path, dst_path)
+    metadata, body = parse_front_matter(markdown_content)
+    record_metadata(metadata)
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    
-    # Read markdown
-    with open(from_path, 'r') as f:
-        markdown_content = f.read()
-    
-    # Read template
-    with open(template_path, 'r') as f:
-        template_content = f.read()
-    
     # Convert markdown to HTML
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
-    
-    # Extract title
-    title = extract_title(markdown_content)
-    
-    # Replace placeholders
-    full_html = template_content.replace("{{ Title }}", title).replace("{{ Content }}", html_content)
-    
-    # Replace basepath in href and src
-    full_html = full_html.replace('href="/', f'href="{basepath}')
-    full_html = full_html.replace('src="/', f'src="{basepath}')
-    
-    # Ensure destination directory exists
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    cache_hit = None
+    if cache is None:
+        html_content = markdown_to_html(body, memo)
+    else:
+        with stage("cache"):
+            # Keyed on the body alone: front matter edits leave the HTML valid
+            entry, cache_hit = cache.render(
+                body, lambda markdown: pack_entry(markdown_to_html(markdown, memo), snapshot_references()))
+            html_content, references = unpack_entry(entry)
+            if cache_hit:
+                # Nothing was rendered, so replay the references stored with the HTML
+                if references is not None:
+                    restore_references(references)
+                else:
+                    record_markdown_text(body)
     
-    # Write to file
-    with open(dest_path, 'w') as f:
-        f.write(full_html)
+    with stage("template"):
+        if images is not None:
+            html_content = images.rewrite(html_content)
+        html_content = apply_basepath(html_content, template.basepath, template.assets)
+        
+        # The front matter title, or else the first heading
+        title = metadata.get("title") or extract_title(body)
+        record_title(title)
+        
+        return template.render(Title=title, Content=html_content), cache_hit
+
+def _with_basepath(chunks, basepath, images=None, assets=None):
+    for chunk in chunks:
+        with stage("template"):
+            if images is not None:
+                chunk = images.rewrite(chunk)
+            chunk = apply_basepath(chunk, basepath, assets)
+        yield chunk
 
-def generate_pages_recursive(content_dir, template_path, dest_dir, basepath="/"):
+def stream_page(from_path, template, dest_path, memo=None, images=None):
     """
-    Recursively generate HTML pages from all index.md files in content_dir
+    Render from_path into dest_path one block at a time. A first pass over
+    the file finds the title, unless the front matter gives it; the second
+    parses, serializes and writes each block between the template's literal
+    segments as it is read, so memory stays proportional to the largest
+    block rather than the whole page. Returns whether dest_path was written
+    (False if it was already current).
+    """
+    with open(from_path, 'r') as f:
+        with stage("read"):
+            metadata = read_front_matter(f)
+            body_start = f.tell()
+            title = metadata.get("title") or extract_title(f)
+        record_metadata(metadata)
+        record_title(title)
+        f.seek(body_start)
+        content = _with_basepath(iter_markdown_html(f, memo), template.basepath, images, template.assets)
+        with stage("write"):
+            with OutputFile(dest_path) as out:
+                template.render_to(out.write, Title=title, Content=content)
+    return out.changed
+
+class PageResult:
+    """
+    What rendering one page produced, returned from (possibly remote) workers.
+    changed is False when the output already held the rendered bytes.
+    cache_hit is None without a render cache and profile is None unless
+    profiling. links, images, title, metadata, terms and summary come from
+    the page's PageReferences. memo_hits and memo_misses count the page's block
+    memo lookups.
+    """
+
+    __slots__ = ("source", "output", "template", "changed", "cache_hit", "profile", "links", "images",
+                 "title", "metadata", "terms", "summary", "memo_hits", "memo_misses")
+
+    def __init__(self, source, output, template, changed=True, cache_hit=None, profile=None,
+                 refs=None, memo_hits=0, memo_misses=0):
+        self.source = source
+        self.output = output
+        self.template = template
+        self.changed = changed
+        self.cache_hit = cache_hit
+        self.profile = profile
+        self.links = refs.links if refs is not None else ()
+        self.images = refs.images if refs is not None else ()
+        self.title = refs.title if refs is not None else None
+        self.metadata = refs.metadata if refs is not None else {}
+        self.terms = tuple(sorted(refs.terms)) if refs is not None else ()
+        self.summary = refs.summary if refs is not None else ""
+        self.memo_hits = memo_hits
+        self.memo_misses = memo_misses
+
+def _memo_counts(memo):
+    if memo is None:
+        return 0, 0
+    return memo.hits, memo.misses
+
+def write_page(from_path, template, dest_path, cache=None, profile=False, memo_size=0, images=None):
+    """
+    Render from_path into dest_path and return a PageResult. Pages are
+    streamed unless a render cache is in use and the page is small enough
+    to hold in memory. With memo_size, rendered blocks are memoized in a
+    per-process BlockMemo of that many entries.
+    """
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
+    memo = process_memo(memo_size)
+    hits_before, misses_before = _memo_counts(memo)
+    page_profile = begin_page(from_path) if profile else None
+    refs = begin_collecting()
+    cache_hit = None
+    try:
+        if cache is None or os.path.getsize(from_path) > STREAM_THRESHOLD:
+            changed = stream_page(from_path, template, dest_path, memo, images)
+        else:
+            # Read markdown
+            with stage("read"):
+                with open(from_path, 'r') as f:
+                    markdown_content = f.read()
+
+            full_html, cache_hit = render_page(markdown_content, template, cache, memo, images)
+
+            with stage("write"):
+                changed = write_output(dest_path, full_html)
+    finally:
+        end_page()
+        end_collecting()
+    if page_profile is not None:
+        page_profile.bytes_in = os.path.getsize(from_path)
+        page_profile.bytes_out = os.path.getsize(dest_path)
+    hits, misses = _memo_counts(memo)
+    return PageResult(from_path, dest_path, template.path, changed, cache_hit, page_profile,
+                      refs, hits - hits_before, misses - misses_before)
+
+def render_read_page(from_path, markdown_content, template, dest_path, cache=None, profile=False,
+                     memo_size=0, images=None):
+    """
+    The rendering half of write_page, for builds that read and write pages
+    themselves. Returns (html, PageResult); the result's changed flag is left
+    for whoever writes the html to fill in.
+    """
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
+    memo = process_memo(memo_size)
+    hits_before, misses_before = _memo_counts(memo)
+    page_profile = begin_page(from_path) if profile else None
+    refs = begin_collecting()
+    try:
+        full_html, cache_hit = render_page(markdown_content, template, cache, memo, images)
+    finally:
+        end_page()
+        end_collecting()
+    if page_profile is not None:
+        page_profile.bytes_in = len(markdown_content.encode())
+        page_profile.bytes_out = len(full_html.encode())
+    hits, misses = _memo_counts(memo)
+    return full_html, PageResult(from_path, dest_path, template.path, None, cache_hit, page_profile,
+                                 refs, hits - hits_before, misses - misses_before)
+
+def generate_page(from_path, template_path, dest_path, basepath="/"):
+    write_page(from_path, CompiledTemplate.load(template_path, basepath), dest_path)
+
+def collect_pages(content_dir, dest_dir, drafts=False):
+    """
+    Find every index.md under content_dir and pair it with its output path.
+    Returns a list of (md_path, html_path) tuples sorted by md_path.
+    """
+    return sorted(iter_pages(content_dir, dest_dir, drafts))
+
+def iter_pages(content_dir, dest_dir, drafts=False):
+    """
+    Yield (md_path, html_path) for every index.md under content_dir as the
+    directory walk finds it, visiting subdirectories in sorted order. Pages
+    whose front matter marks them as drafts are skipped unless drafts is
+    set; only their front matter is read.
     """
     for root, dirs, files in os.walk(content_dir):
+        dirs.sort()
         for file in files:
             if file == 'index.md':
                 # Get relative path from content_dir
@@ -68,6 +220,8 @@ def generate_pages_recursive(content_dir, template_path, dest_dir, basepath="/")
                 
                 # Source markdown path
                 md_path = os.path.join(root, file)
+                if not drafts and is_draft(md_path):
+                    continue
                 
                 # Destination HTML path
                 if rel_path:
@@ -75,26 +229,454 @@ def generate_pages_recursive(content_dir, template_path, dest_dir, basepath="/")
                 else:
                     html_path = os.path.join(dest_dir, 'index.html')
                 
-                # Generate the page
-                generate_page(md_path, template_path, html_path, basepath)
+                yield md_path, html_path
+
+def page_metadata(md_path):
+    """
+    A page's front matter, or {} when it is invalid: rendering the page then
+    fails on it and reports it with the other page failures.
+    """
+    try:
+        return read_page_metadata(md_path)
+    except ValueError:
+        return {}
+
+def is_draft(md_path):
+    return bool(page_metadata(md_path).get("draft"))
+
+def page_template(templates, md_path, content_dir):
+    """
+    The template for a page: the one its front matter names, or its
+    section's.
+    """
+    return templates.for_page(os.path.relpath(md_path, content_dir), page_metadata(md_path).get("template"))
+
+def write_pages(pages, content_dir, templates, jobs=1, cache=None, profiler=None, pipeline=False,
+                io_threads=8, memo_size=0, images=None):
+    """
+    Render (md_path, html_path) pairs with write_page, each with its own
+    compiled template, and add the render cache outcomes to cache and the
+    page profiles to profiler. memo_size enables each worker's block memo and
+    images, an ImageSet, rewrites <img> tags.
+    Returns the PageResults in page order.
+
+    With pipeline, pages may be any iterable and are built by
+    pipelined_write_pages instead of spread over jobs processes.
+    """
+    if pipeline:
+        results = pipelined_write_pages(pages, content_dir, templates, cache, profiler, io_threads,
+                                        memo_size, images)
+    else:
+        results = build_pages(
+            write_page,
+            [(md_path, page_template(templates, md_path, content_dir), html_path, cache,
+              profiler is not None, memo_size, images)
+             for md_path, html_path in pages],
+            jobs,
+        )
+    if cache is not None:
+        cache.tally(result.cache_hit for result in results)
+    if profiler is not None:
+        for result in results:
+            profiler.add(result.profile)
+    written = sum(1 for result in results if result.changed)
+    print(f"Pages: {written} written, {len(results) - written} unchanged")
+    if memo_size:
+        hits = sum(result.memo_hits for result in results)
+        misses = sum(result.memo_misses for result in results)
+        print(f"Block memo: {hits} hits, {misses} misses")
+    return results
+
+def pipelined_write_pages(pages, content_dir, templates, cache=None, profiler=None, io_threads=8,
+                          memo_size=0, images=None):
+    """
+    Build pages with reads and writes on io_threads threads overlapping the
+    rendering (done in this process) and the scan producing pages, through
+    bounded queues. Pages too large to read whole are streamed instead.
+    """
+    profile = profiler is not None
+
+    def read(page):
+        md_path, html_path = page
+        if os.path.getsize(md_path) > STREAM_THRESHOLD:
+            return None
+        with open(md_path, 'r') as f:
+            return f.read()
+
+    def render(page, markdown_content):
+        md_path, html_path = page
+        if markdown_content is None:
+            template = page_template(templates, md_path, content_dir)
+            return None, write_page(md_path, template, html_path, None, profile, memo_size, images)
+        metadata, _ = parse_front_matter(markdown_content)
+        template = templates.for_page(os.path.relpath(md_path, content_dir), metadata.get("template"))
+        full_html, result = render_read_page(md_path, markdown_content, template, html_path, cache, profile,
+                                             memo_size, images)
+        return (full_html, result), result
+
+    def write(output):
+        if output is not None:
+            full_html, result = output
+            result.changed = write_output(result.output, full_html)
+
+    return run_pipeline(pages, read, render, write, io_threads)
+
+def index_references(references, results, content_dir, dest_dir):
+    for result in results:
+        references.add_page(page_url(os.path.relpath(result.output, dest_dir)),
+                            os.path.relpath(result.source, content_dir),
+                            result.links, result.images)
+
+def generate_pages_recursive(content_dir, template_path, dest_dir, basepath="/", jobs=1,
+                             templates_dir="templates", cache=None, profiler=None, references=None,
+                             changes=None, pipeline=False, memo_size=0, site=None, images=None,
+                             minify=False, assets=None, drafts=False):
+    """
+    Recursively generate HTML pages from all index.md files in content_dir
+    (draft pages only with drafts), spread over `jobs` worker processes when
+    jobs > 1, or overlapping the directory scan, reads, rendering and
+    writes when pipeline is set
+    """
+    templates = TemplateSet(template_path, basepath, templates_dir, minify, assets)
+    if pipeline:
+        pages = iter_pages(content_dir, dest_dir, drafts)
+    else:
+        pages = collect_pages(content_dir, dest_dir, drafts)
+    results = write_pages(pages, content_dir, templates, jobs, cache, profiler, pipeline,
+                          memo_size=memo_size, images=images)
+    if references is not None:
+        index_references(references, results, content_dir, dest_dir)
+    if site is not None:
+        site.add_results(results, dest_dir)
+    if changes is not None:
+        changes.add_pages(results, dest_dir)
+    return results
+
+def static_transforms(minify=False):
+    """
+    The sync_dir transforms for static files: stylesheets are minified with
+    minify.
+    """
+    return {".css": minify_css} if minify else None
+
+def sync_static(static_dir, dest_dir, pages, use_hash=False, link=False, keep_outputs=(), minify=False,
+                precompress=False):
+    """
+    Mirror static_dir into dest_dir, copying only changed files and deleting
+    anything that is neither a static file, one of the generated pages nor
+    in keep_outputs (paths relative to dest_dir). With minify stylesheets
+    are minified on the way; with precompress the .gz/.br siblings of the
+    kept files are left for precompress_dir to update.
+    """
+    keep = [os.path.relpath(html_path, dest_dir) for md_path, html_path in pages]
+    keep.extend(keep_outputs)
+    transforms = static_transforms(minify)
+    sibling_suffixes = COMPRESSED_SUFFIXES if precompress else ()
+    result = sync_dir(static_dir, dest_dir, keep, use_hash, link, transforms=transforms,
+                      sibling_suffixes=sibling_suffixes)
+    for rel_path in result.copied:
+        print(f"Copied file: {os.path.join(static_dir, rel_path)} to {os.path.join(dest_dir, rel_path)}")
+    for rel_path in result.removed:
+        print(f"Removed stale file: {rel_path}")
+    print(f"Static files: {len(result.copied)} copied, {result.unchanged} unchanged, {len(result.removed)} removed")
+    return result
+
+def page_dependencies(result, dest_dir, static_dir, static_files):
+    """
+    The inputs a rendered page depends on: its markdown, its template and
+    every static file it links to or embeds.
+    """
+    inputs = [result.source, result.template]
+    url = page_url(os.path.relpath(result.output, dest_dir))
+    for target in list(result.links) + list(result.images):
+        resolved = resolve_target(url, target)
+        if resolved is None:
+            continue
+        rel_path = resolved.lstrip("/").replace("/", os.sep)
+        if rel_path in static_files:
+            inputs.append(os.path.join(static_dir, rel_path))
+    return inputs
+
+def record_dependencies(graph, results, dest_dir, static_dir):
+    static_files = set(list_files(static_dir))
+    for result in results:
+        graph.set_inputs(os.path.relpath(result.output, dest_dir),
+                         page_dependencies(result, dest_dir, static_dir, static_files))
+
+def scan_pages(content_dir, dest_dir, previous_pages, drafts=False):
+    """
+    collect_pages for an incremental build. Also returns the manifest entry
+    of every page, drafts included, keyed by its path relative to
+    content_dir: {"hash", "size", "mtime_ns", "draft", "output"}. A page
+    whose size and mtime match its entry in previous_pages is not read.
+    """
+    pages = []
+    entries = {}
+    for md_path, html_path in iter_pages(content_dir, dest_dir, drafts=True):
+        rel_md = os.path.relpath(md_path, content_dir)
+        stat = os.stat(md_path)
+        entry = previous_pages.get(rel_md)
+        if entry is None or entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            with open(md_path, 'rb') as f:
+                digest = hash_bytes(f.read())
+            entry = {"hash": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                     "draft": is_draft(md_path)}
+        entries[rel_md] = dict(entry, output=os.path.relpath(html_path, dest_dir))
+        if drafts or not entries[rel_md]["draft"]:
+            pages.append((md_path, html_path))
+    return sorted(pages), entries
+
+def incremental_build(content_dir, static_dir, template_path, dest_dir, basepath="/",
+                      manifest_path=MANIFEST_PATH, jobs=1, templates_dir="templates", cache=None,
+                      hash_static=False, link_static=False, profiler=None, references=None,
+                      graph_path=DEPENDENCIES_PATH, changes=None, pipeline=False, memo_size=0,
+                      site=None, keep_outputs=(), images=None, minify=False, precompress=False,
+                      assets=None, drafts=False, full=False):
+    """
+    Rebuild only what changed since the last build recorded in manifest_path.
+    With full every page is regenerated, but the manifest and dependency
+    graph are still recorded so a later incremental build can trust them.
+
+    Changed markdown, templates and static files are looked up in the
+    dependency graph at graph_path to find the pages that used them. Every
+    page is regenerated when the basepath, image processing, minification or
+    asset fingerprinting changes or a template is added or removed. assets
+    maps static URLs to fingerprinted ones; a template whose assets change
+    counts as changed. Outputs whose sources were deleted are removed by the
+    static sync (which keeps their precompressed siblings when precompress
+    is set). references and site, if given, are updated for the regenerated
+    pages and pruned of deleted ones; pages missing from site are
+    regenerated. Draft pages are only built with drafts. keep_outputs are
+    extra files in dest_dir the static sync must not delete, and changes,
+    if given, collects the outputs written and removed. Returns the list of
+    markdown paths regenerated.
+    """
+    manifest = BuildManifest.load(manifest_path)
+    graph = DependencyGraph.load(graph_path)
+    templates = TemplateSet(template_path, basepath, templates_dir, minify, assets)
+    template_hashes = templates.source_hashes()
+    options = {"images": images is not None, "minify": minify, "fingerprint": assets is not None}
+    rebuild_all = (full or manifest.basepath != basepath or graph.basepath != basepath
+                   or set(template_hashes) != set(manifest.templates) or manifest.options != options)
+    changed = [path for path, digest in template_hashes.items() if manifest.templates.get(path) != digest]
+
+    all_pages, pages = scan_pages(content_dir, dest_dir, manifest.pages, drafts)
+    sync = sync_static(static_dir, dest_dir, all_pages, hash_static, link_static, keep_outputs, minify,
+                       precompress)
+    if changes is not None:
+        changes.add_sync(sync)
+    changed.extend(os.path.join(static_dir, rel_path) for rel_path in sync.copied + sync.removed)
+
+    dirty_outputs = set()
+    for md_path, html_path in all_pages:
+        rel_md = os.path.relpath(md_path, content_dir)
+        rel_html = os.path.relpath(html_path, dest_dir)
+        previous = manifest.pages.get(rel_md)
+        if previous is None or previous["hash"] != pages[rel_md]["hash"]:
+            changed.append(md_path)
+        if rebuild_all or rel_html not in graph.outputs or not os.path.exists(html_path):
+            dirty_outputs.add(rel_html)
+        elif site is not None and page_url(rel_html) not in site.pages:
+            # Its metadata was never indexed (e.g. an index from an older version)
+            dirty_outputs.add(rel_html)
+    dirty_outputs.update(graph.affected(changed))
+    dirty = [(md_path, html_path) for md_path, html_path in all_pages
+             if os.path.relpath(html_path, dest_dir) in dirty_outputs]
+
+    # Forget pages whose markdown was deleted
+    live_outputs = {os.path.relpath(html_path, dest_dir) for md_path, html_path in all_pages}
+    for output in list(graph.outputs):
+        if output not in live_outputs:
+            graph.remove_output(output)
+
+    manifest.templates = template_hashes
+    manifest.basepath = basepath
+    manifest.options = options
+    manifest.pages = pages
+    graph.basepath = basepath
+    live_urls = [page_url(os.path.relpath(html_path, dest_dir)) for md_path, html_path in all_pages]
+    if references is not None:
+        references.retain(live_urls)
+    if site is not None:
+        site.retain(live_urls)
+    try:
+        results = write_pages(dirty, content_dir, templates, jobs, cache, profiler, pipeline,
+                              memo_size=memo_size, images=images)
+        record_dependencies(graph, results, dest_dir, static_dir)
+        if references is not None:
+            index_references(references, results, content_dir, dest_dir)
+        if site is not None:
+            site.add_results(results, dest_dir)
+        if changes is not None:
+            changes.add_pages(results, dest_dir)
+    except BuildError as e:
+        # Keep what did build; leave failed pages out of the manifest and
+        # graph so the next build retries them
+        record_dependencies(graph, e.results, dest_dir, static_dir)
+        if references is not None:
+            index_references(references, e.results, content_dir, dest_dir)
+        if site is not None:
+            site.add_results(e.results, dest_dir)
+        if changes is not None:
+            changes.add_pages(e.results, dest_dir)
+        for md_path, _ in e.failures:
+            entry = pages.pop(os.path.relpath(md_path, content_dir), None)
+            if entry is not None:
+                graph.remove_output(entry["output"])
+        raise
+    finally:
+        manifest.save(manifest_path)
+        graph.save(graph_path)
+    return [md_path for md_path, html_path in dirty]
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix for href/src attributes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild pages and static files that changed since the last build")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="render pages in N worker processes (0 = one per CPU)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap scanning, reads, rendering and writes in one process (for I/O bound builds)")
+    parser.add_argument("--cache", action="store_true",
+                        help=f"reuse rendered HTML for unchanged markdown from {DEFAULT_CACHE_DIR}")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB",
+                        help="evict least recently used render cache entries beyond this size")
+    parser.add_argument("--shared-cache", metavar="DIR",
+                        help="secondary render cache directory shared between machines")
+    parser.add_argument("--block-memo", type=int, default=DEFAULT_MEMO_ENTRIES, metavar="N",
+                        help="reuse the HTML of up to N recently seen blocks per worker, "
+                             f"holding at most {DEFAULT_MEMO_BYTES // (1024 * 1024)} MB of them (0 = off)")
+    parser.add_argument("--hash-static", action="store_true",
+                        help="compare static files by content hash instead of size and mtime")
+    parser.add_argument("--link-static", action="store_true",
+                        help="hardlink static files into docs/ where the filesystem allows")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every pipeline stage per page and print a report")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="number of slowest pages to list in the profile report")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace JSON of the build (implies --profile)")
+    parser.add_argument("--check-links", action="store_true",
+                        help="fail the build when a page links to a missing page or static file")
+    parser.add_argument("--images", action="store_true",
+                        help="publish images under content-hashed names with resized variants, and add "
+                             "width/height/srcset/lazy loading to <img> tags")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="public URL of the site; writes sitemap.xml and an Atom feed.xml of the blog")
+    parser.add_argument("--search-index", action="store_true",
+                        help="write docs/search-index.json, an inverted index of the words on every page")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="publish static files under content-hashed names as well, point pages at "
+                             "them and list them in docs/asset-manifest.json")
+    parser.add_argument("--minify", action="store_true",
+                        help="strip insignificant whitespace from pages and stylesheets")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz (and .br, with the brotli module) copies of changed text outputs "
+                             "for servers to send as they are")
+    parser.add_argument("--drafts", action="store_true",
+                        help="also build pages whose front matter says draft: true")
+    parser.add_argument("--listings", action="store_true",
+                        help="generate a page per front matter tag, a tag index at /tags/ and a listing for "
+                             "each section without an index page")
+    parser.add_argument("--changed-outputs", metavar="FILE",
+                        help="write a JSON list of the files in docs/ this build wrote or removed")
+    args = parser.parse_args(argv)
+    if args.pipeline and args.jobs != 1:
+        parser.error("--pipeline renders in a single process and cannot be combined with --jobs")
+    return args
 
 def main():
-    # Get basepath from command line argument
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    args = parse_args(sys.argv[1:])
+    basepath = args.basepath
     
     dest_dir = "docs"  # Build into docs for GitHub Pages
-    
-    # Delete docs directory
-    if os.path.exists(dest_dir):
-        shutil.rmtree(dest_dir)
-    
-    # Copy static files
-    copy_dir("static", dest_dir)
-    
-    # Generate all pages
-    generate_pages_recursive("content", "template.html", dest_dir, basepath)
+
+    cache = None
+    if args.cache or args.shared_cache:
+        cache = RenderCache(DEFAULT_CACHE_DIR, CONVERTER_VERSION,
+                            args.cache_size * 1024 * 1024, args.shared_cache)
+    profiler = BuildProfiler() if args.profile or args.trace else None
+    # Incremental builds only re-render some pages, so start from the last index
+    references = ReferenceIndex.load() if args.incremental else ReferenceIndex()
+    site = SiteIndex.load() if args.incremental else SiteIndex()
+    if not args.listings:
+        site.listings = {}
+    elif not args.incremental:
+        # Keep the listing hashes, so unchanged listing pages are neither
+        # deleted by the static sync nor rendered again
+        site.listings = SiteIndex.load().listings
+    extra_outputs = site_outputs(args.site_url, args.search_index)
+    extra_outputs.extend(site.listings)
+    changes = OutputChanges()
+
+    try:
+        images = None
+        if args.images:
+            images = process_images("static", dest_dir, basepath, jobs=args.jobs)
+            extra_outputs.extend(images.outputs)
+        asset_urls = None
+        if args.fingerprint:
+            assets = fingerprint_assets("static", dest_dir, static_transforms(args.minify))
+            asset_urls = assets.urls
+            extra_outputs.extend(assets.outputs)
+            changes.written.extend(assets.written)
+    except BuildError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    try:
+        # A full build regenerates every page but still records the
+        # manifest, so a later --incremental build starts from this output
+        incremental_build("content", "static", "template.html", dest_dir, basepath,
+                          jobs=args.jobs, cache=cache,
+                          hash_static=args.hash_static, link_static=args.link_static,
+                          profiler=profiler, references=references, changes=changes,
+                          pipeline=args.pipeline, memo_size=args.block_memo,
+                          site=site, keep_outputs=extra_outputs, images=images,
+                          minify=args.minify, precompress=args.precompress,
+                          assets=asset_urls, drafts=args.drafts, full=not args.incremental)
+    except BuildError as e:
+        # The manifest now records the pages that did build, so they will not
+        # be rebuilt: their references and metadata must be saved as well
+        references.save(REFERENCES_PATH)
+        site.save(SITE_INDEX_PATH)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if args.listings:
+        templates = TemplateSet("template.html", basepath, "templates", args.minify, asset_urls)
+        written, removed = write_listings(site, templates, dest_dir)
+        for rel_path in written:
+            print(f"Wrote listing {os.path.join(dest_dir, rel_path)}")
+        changes.written.extend(written)
+        changes.removed.extend(removed)
+    references.save(REFERENCES_PATH)
+    site.save(SITE_INDEX_PATH)
+    for name in write_site_outputs(site, dest_dir, basepath, args.site_url, args.search_index):
+        print(f"Wrote {os.path.join(dest_dir, name)}")
+        changes.written.append(name)
+    if args.precompress:
+        compressed = precompress_dir(dest_dir)
+        print(f"Precompressed: {len(compressed.written)} written, {compressed.unchanged} unchanged, "
+              f"{len(compressed.removed)} removed")
+        changes.written.extend(compressed.written)
+        changes.removed.extend(compressed.removed)
+    if args.changed_outputs:
+        changes.save(args.changed_outputs)
+
+    if cache is not None:
+        cache.evict()
+        print(f"Render cache: {cache.hits} hits, {cache.misses} misses")
+    if profiler is not None:
+        print(profiler.report(args.profile_top))
+        if args.trace:
+            profiler.write_chrome_trace(args.trace)
+            print(f"Wrote trace to {args.trace}")
+
+    broken = references.broken_references(list_files("static"), extra_outputs + list(site.listings))
+    for page, target in broken:
+        print(f"Broken reference: {page} -> {target}", file=sys.stderr)
+    if broken and args.check_links:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
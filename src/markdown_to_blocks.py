@@ -1,3 +1,5 @@
+from block_parser import iter_blocks
+
 def markdown_to_blocks(markdown):
-    blocks = [block.strip() for block in markdown.split("\n\n") if block.strip()]
-    return blocks
\ No newline at end of file
+    blocks = ["\n".join(lines) for _, lines in iter_blocks(markdown)]
+    return blocks
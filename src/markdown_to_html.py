@@ -1,23 +1,40 @@
-from markdown_to_blocks import markdown_to_blocks
+import re
 from block_types import BlockType, block_to_block_type
+from block_parser import iter_blocks, iter_lines
 from textnode import TextNode, TextType
 from textnode_to_htmlnode import text_node_to_html_node
 from extract_markdown import text_to_textnodes
+from inline_scanner import is_plain_text
 from htmlnode import HTMLNode, LeafNode, ParentNode
+from profiling import stage, timed_iter
+from reference_index import (fold_text, record_references, record_targets, record_text, reference_mark,
+                             references_since)
+
+# Bump whenever markdown_to_html_node output changes, to invalidate render caches
+CONVERTER_VERSION = "1"
+
+ORDERED_ITEM_PREFIX = re.compile(r"^\d+\. ")
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    return [text_node_to_html_node(node) for node in text_nodes]
+    with stage("inline"):
+        if text and is_plain_text(text):
+            # Most prose has no markup: skip tokenizing and emit one text leaf
+            record_text(text)
+            return [LeafNode(None, text)]
+        text_nodes = text_to_textnodes(text)
+        record_references(text_nodes)
+        return [text_node_to_html_node(node) for node in text_nodes]
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
-    lines = block.split("\n")
+    return typed_block_to_html_node(block_to_block_type(block), block.split("\n"))
 
+def block_texts(block_type, lines):
+    """
+    The text a block renders: the literal content of a code block, one
+    string of inline markdown per list item, or one for any other block.
+    """
     if block_type == BlockType.HEADING:
-        level = block.count("#", 0, block.find(" "))
-        content = block.lstrip("# ").strip()
-        children = text_to_children(content)
-        return ParentNode(f"h{level}", children)
+        return ["\n".join(lines).lstrip("# ").strip()]
 
     if block_type == BlockType.CODE:
         # Remove the first and last line's triple backticks, preserve all formatting
@@ -26,44 +43,109 @@ def block_to_html_node(block):
             code_lines = code_lines[1:]
         if code_lines and code_lines[-1].startswith("```"):
             code_lines = code_lines[:-1]
-        content = "\n".join(code_lines) + "\n"
-        text_node = TextNode(content, TextType.TEXT)
-        code_node = text_node_to_html_node(text_node)
-        return ParentNode("pre", [ParentNode("code", [code_node])])
+        return ["\n".join(code_lines) + "\n"]
 
     if block_type == BlockType.QUOTE:
         # Preserve newlines between quote lines
-        content = "\n".join(line.lstrip("> ").strip() for line in lines if line.strip())
-        children = text_to_children(content)
-        return ParentNode("blockquote", children)
+        return ["\n".join(line.lstrip("> ").strip() for line in lines if line.strip())]
 
     if block_type == BlockType.UNORDERED_LIST:
-        items = [line.lstrip("- ").strip() for line in lines if line.strip()]
-        children = [ParentNode("li", text_to_children(item)) for item in items]
-        return ParentNode("ul", children)
+        return [line.lstrip("- ").strip() for line in lines if line.strip()]
 
     if block_type == BlockType.ORDERED_LIST:
-        import re
-        items = [re.sub(r"^\d+\. ", "", line).strip() for line in lines if line.strip()]
-        children = [ParentNode("li", text_to_children(item)) for item in items]
-        return ParentNode("ol", children)
+        return [ORDERED_ITEM_PREFIX.sub("", line, count=1).strip() for line in lines if line.strip()]
 
     if block_type == BlockType.PARAGRAPH:
         # Join lines with a space for paragraphs
-        content = " ".join(line.strip() for line in lines if line.strip())
-        children = text_to_children(content)
-        return ParentNode("p", children)
+        return [" ".join(line.strip() for line in lines if line.strip())]
 
     raise ValueError(f"Unknown block type: {block_type}")
 
+def typed_block_to_html_node(block_type, lines):
+    texts = block_texts(block_type, lines)
+
+    if block_type == BlockType.HEADING:
+        level = lines[0].count("#", 0, lines[0].find(" "))
+        return ParentNode(f"h{level}", text_to_children(texts[0]))
+
+    if block_type == BlockType.CODE:
+        record_text(texts[0])
+        code_node = text_node_to_html_node(TextNode(texts[0], TextType.TEXT))
+        return ParentNode("pre", [ParentNode("code", [code_node])])
+
+    if block_type == BlockType.QUOTE:
+        return ParentNode("blockquote", text_to_children(texts[0]))
+
+    if block_type == BlockType.UNORDERED_LIST:
+        return ParentNode("ul", [ParentNode("li", text_to_children(item)) for item in texts])
+
+    if block_type == BlockType.ORDERED_LIST:
+        return ParentNode("ol", [ParentNode("li", text_to_children(item)) for item in texts])
+
+    return ParentNode("p", text_to_children(texts[0]))
+
+def record_markdown_text(markdown):
+    """
+    Record a page's references and text the way rendering it would, without
+    building any HTML: for pages whose HTML came from the render cache.
+    """
+    for block_type, lines in iter_blocks(markdown):
+        texts = block_texts(block_type, lines)
+        if block_type == BlockType.CODE:
+            record_text(texts[0])
+        else:
+            for text in texts:
+                record_references(text_to_textnodes(text))
+        fold_text()
+
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children = [block_to_html_node(block) for block in blocks]
+    """
+    Convert markdown (a string or an iterable of lines, e.g. an open file)
+    into a div ParentNode with one child per block.
+    """
+    children = []
+    for block_type, lines in timed_iter("blocks", iter_blocks(markdown)):
+        with stage("block_to_html"):
+            children.append(typed_block_to_html_node(block_type, lines))
     return ParentNode("div", children)
 
+def iter_markdown_html(markdown, memo=None):
+    """
+    Yield markdown_to_html_node(markdown).to_html() in pieces: the opening
+    div, each block's HTML as soon as the block is parsed, then the closing
+    div. Only one block's node tree is alive at a time. With a BlockMemo,
+    blocks it has seen before are not parsed again.
+    """
+    yield "<div>"
+    for block_type, lines in timed_iter("blocks", iter_blocks(markdown)):
+        if memo is None:
+            html = _block_html(block_type, lines)
+        else:
+            key = (block_type, "\n".join(lines))
+            entry = memo.get(key)
+            if entry is None:
+                mark = reference_mark()
+                html = _block_html(block_type, lines)
+                memo.put(key, (html, references_since(mark)), len(key[1]) + len(html))
+            else:
+                html, references = entry
+                record_targets(*references)
+        fold_text()
+        yield html
+    yield "</div>"
+
+def _block_html(block_type, lines):
+    with stage("block_to_html"):
+        node = typed_block_to_html_node(block_type, lines)
+    with stage("to_html"):
+        return node.to_html()
+
 def extract_title(markdown):
-    lines = markdown.split("\n")
-    for line in lines:
+    """
+    The text of the first "# " line of markdown (a string or an iterable of
+    lines), which stops reading as soon as it is found.
+    """
+    for line in iter_lines(markdown):
         if line.startswith("# "):
             return line[2:].strip()
     raise ValueError("No h1 header found in markdown")
\ No newline at end of file
@@ -0,0 +1,67 @@
+import re
+
+# Elements whose contents are whitespace sensitive or not HTML
+HTML_PRESERVED_PATTERN = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>", re.S | re.I)
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.S)
+# Whitespace around these tags never renders, so it can be dropped outright;
+# around inline tags it is collapsed to a single space instead
+BLOCK_TAGS = ("html|head|body|meta|link|title|base|div|p|article|section|header|footer|nav|main|aside|"
+              "h[1-6]|ul|ol|li|dl|dt|dd|table|thead|tbody|tfoot|tr|th|td|blockquote|figure|figcaption|"
+              "form|hr|br|!doctype")
+SPACE_AFTER_BLOCK_TAG = re.compile(rf"(</?(?:{BLOCK_TAGS})\b[^>]*>)\s+", re.I)
+SPACE_BEFORE_BLOCK_TAG = re.compile(rf"\s+(</?(?:{BLOCK_TAGS})\b)", re.I)
+WHITESPACE = re.compile(r"\s+")
+
+CSS_STRING_OR_COMMENT = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|/\*.*?\*/', re.S)
+CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+CSS_COLON = re.compile(r":\s+")
+
+def _collapse_html(html):
+    html = HTML_COMMENT_PATTERN.sub("", html)
+    html = SPACE_AFTER_BLOCK_TAG.sub(r"\1", html)
+    html = SPACE_BEFORE_BLOCK_TAG.sub(r"\1", html)
+    return WHITESPACE.sub(" ", html)
+
+def minify_html(html):
+    """
+    Drop comments and whitespace that cannot render: whitespace next to
+    block-level tags is removed and other runs shrink to one space.
+    <pre>, <textarea>, <script> and <style> elements are left untouched.
+    """
+    parts = []
+    pos = 0
+    for match in HTML_PRESERVED_PATTERN.finditer(html):
+        parts.append(_collapse_html(html[pos:match.start()]))
+        parts.append(match.group(0))
+        pos = match.end()
+    parts.append(_collapse_html(html[pos:]))
+    return "".join(parts)
+
+def _squeeze_css(css):
+    css = WHITESPACE.sub(" ", css)
+    css = CSS_PUNCTUATION.sub(r"\1", css)
+    # Only after the colon: "a :hover" and "a:hover" are different selectors
+    css = CSS_COLON.sub(":", css)
+    return css.replace(";}", "}")
+
+def minify_css(css):
+    """
+    Strip comments and insignificant whitespace from a stylesheet, and the
+    last semicolon of each block. Strings are copied as they are.
+    """
+    parts = []
+    code = []
+    pos = 0
+    for match in CSS_STRING_OR_COMMENT.finditer(css):
+        code.append(css[pos:match.start()])
+        token = match.group(0)
+        if token.startswith("/*"):
+            code.append(" ")
+        else:
+            parts.append(_squeeze_css("".join(code)))
+            parts.append(token)
+            code = []
+        pos = match.end()
+    code.append(css[pos:])
+    parts.append(_squeeze_css("".join(code)))
+    return "".join(parts).strip()
@@ -0,0 +1,134 @@
+import json
+import os
+
+COPY_CHUNK = 1024 * 1024
+
+class OutputFile:
+    """
+    A text file written atomically, and only if its content changed.
+
+    Chunks passed to write() are compared with the existing file as they
+    arrive, and nothing is written while they match. At the first difference
+    the matching prefix is copied into a temporary file beside the output and
+    writing continues there; close() then renames it over the output. An
+    output whose bytes come out identical is left untouched, mtime included.
+    changed is set by close(). Use as a context manager: an exception
+    discards the temporary file and keeps the previous output.
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.tmp_path = path + ".tmp"
+        self.changed = None
+        self._out = None
+        self._matched = 0
+        try:
+            self._existing = open(path, 'rb')
+        except FileNotFoundError:
+            self._existing = None
+
+    def write(self, text):
+        data = text.encode(self.encoding)
+        if self._out is None:
+            if self._existing is not None and self._existing.read(len(data)) == data:
+                self._matched += len(data)
+                return
+            self._diverge()
+        self._out.write(data)
+
+    def _diverge(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._out = open(self.tmp_path, 'wb')
+        if self._existing is not None:
+            self._existing.seek(0)
+            remaining = self._matched
+            while remaining:
+                chunk = self._existing.read(min(remaining, COPY_CHUNK))
+                self._out.write(chunk)
+                remaining -= len(chunk)
+            self._existing.close()
+            self._existing = None
+
+    def close(self):
+        if self._out is None:
+            if self._existing is not None and not self._existing.read(1):
+                self._existing.close()
+                self._existing = None
+                self.changed = False
+                return False
+            # The old file was longer, or there was none
+            self._diverge()
+        self._out.close()
+        self._out = None
+        os.replace(self.tmp_path, self.path)
+        self.changed = True
+        return True
+
+    def discard(self):
+        if self._existing is not None:
+            self._existing.close()
+            self._existing = None
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+def write_output(path, text):
+    """
+    Write text to path unless it already holds exactly that. Returns whether
+    the file was written.
+    """
+    with OutputFile(path) as out:
+        out.write(text)
+    return out.changed
+
+def save_json(path, data):
+    """
+    Write data to path as indented JSON with sorted keys, atomically and
+    only if it changed: the format of the build state kept in .cache/.
+    """
+    return write_output(path, json.dumps(data, indent=1, sort_keys=True))
+
+class OutputChanges:
+    """
+    The outputs a build wrote or removed, relative to the destination dir,
+    so deploy tooling can upload just those.
+    """
+
+    def __init__(self):
+        self.written = []
+        self.unchanged = 0
+        self.removed = []
+
+    def add_sync(self, sync_result):
+        self.written.extend(sync_result.copied)
+        self.unchanged += sync_result.unchanged
+        self.removed.extend(sync_result.removed)
+
+    def add_pages(self, results, dest_dir):
+        for result in results:
+            if result.changed:
+                self.written.append(os.path.relpath(result.output, dest_dir))
+            else:
+                self.unchanged += 1
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({"written": sorted(self.written), "removed": sorted(self.removed)}, f, indent=1)
+            f.write("\n")
+
+    def __repr__(self):
+        return f"OutputChanges({len(self.written)} written, {self.unchanged} unchanged, {len(self.removed)} removed)"
@@ -0,0 +1,82 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from io import StringIO
+
+class BuildError(Exception):
+    """
+    Raised after a build when one or more pages failed to generate.
+    failures is a list of (source_path, formatted_traceback) tuples and
+    results holds the return values of the pages that did succeed.
+    """
+
+    def __init__(self, failures, results=()):
+        self.failures = failures
+        self.results = list(results)
+        lines = [f"{len(failures)} page(s) failed to build:"]
+        for path, error in failures:
+            lines.append(f"--- {path}\n{error}")
+        super().__init__("\n".join(lines))
+
+def resolve_jobs(jobs):
+    """
+    Turn a --jobs value into a worker count; 0 or None means one per CPU.
+    """
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, jobs)
+
+def _run_job(job):
+    # Runs in a worker: capture the page's log output so the parent can
+    # print it in a deterministic order, and never let an exception escape
+    func, args = job
+    log = StringIO()
+    try:
+        with redirect_stdout(log):
+            result = func(*args)
+    except Exception:
+        return log.getvalue(), traceback.format_exc(), None
+    return log.getvalue(), None, result
+
+def _run_serial(jobs):
+    return [_run_job(job) for job in jobs]
+
+def _run_parallel(jobs, workers):
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_job, jobs, chunksize=chunksize))
+
+def build_pages(func, arg_tuples, jobs=1):
+    """
+    Call func(*args) for every tuple in arg_tuples, in a process pool when
+    jobs > 1. func must be a picklable top-level function whose first argument
+    identifies the page. Output is printed in input order regardless of which
+    worker finished first, and every failure is reported together in a single
+    BuildError once all pages have been attempted. Returns func's return
+    values in input order.
+    """
+    job_list = [(func, args) for args in arg_tuples]
+    workers = min(resolve_jobs(jobs), len(job_list))
+
+    results = None
+    if workers > 1:
+        try:
+            results = _run_parallel(job_list, workers)
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            # No usable process pool here (sandbox, missing semaphores, a
+            # worker killed by the OS): fall back to rendering in-process
+            print(f"Parallel build unavailable ({e}), building serially")
+    if results is None:
+        results = _run_serial(job_list)
+
+    failures = []
+    for (func, args), (log, error, result) in zip(job_list, results):
+        if log:
+            print(log, end="")
+        if error is not None:
+            failures.append((args[0], error))
+    if failures:
+        raise BuildError(failures, [result for log, error, result in results if error is None])
+    return [result for log, error, result in results]
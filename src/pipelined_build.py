@@ -0,0 +1,83 @@
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from parallel_build import BuildError
+
+_DONE = object()
+
+def scan_ahead(iterable, depth=32):
+    """
+    Iterate iterable on a background thread, at most depth items ahead of
+    the consumer. Exceptions raised while iterating are re-raised here.
+    """
+    queue = Queue(maxsize=depth)
+
+    def produce():
+        try:
+            for item in iterable:
+                queue.put((item, None))
+        except BaseException as e:
+            queue.put((_DONE, e))
+            return
+        queue.put((_DONE, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item, error = queue.get()
+        if item is _DONE:
+            if error is not None:
+                raise error
+            return
+        yield item
+
+def run_pipeline(items, read, process, write, io_threads=8, depth=32):
+    """
+    Overlap I/O and CPU work over items: items are produced on a scanning
+    thread, read(item) and write(output) run on a pool of io_threads, and
+    process(item, data) -> (output, result) runs on the calling thread, in
+    item order. At most depth items wait at each stage, so memory stays
+    bounded however many items there are. item[0] identifies an item in
+    failure reports. Returns the results of the items whose write succeeded,
+    in item order, or raises BuildError once every item has been attempted.
+    """
+    results = []
+    failures = []
+    reads = deque()
+    writes = deque()
+
+    def fail(item):
+        failures.append((item[0], traceback.format_exc()))
+
+    def finish_write():
+        item, future, result = writes.popleft()
+        try:
+            future.result()
+            results.append(result)
+        except Exception:
+            fail(item)
+
+    def finish_read(io):
+        item, future = reads.popleft()
+        try:
+            output, result = process(item, future.result())
+        except Exception:
+            fail(item)
+            return
+        if len(writes) >= depth:
+            finish_write()
+        writes.append((item, io.submit(write, output), result))
+
+    with ThreadPoolExecutor(max_workers=io_threads) as io:
+        for item in scan_ahead(items, depth):
+            reads.append((item, io.submit(read, item)))
+            if len(reads) >= depth:
+                finish_read(io)
+        while reads:
+            finish_read(io)
+        while writes:
+            finish_write()
+    if failures:
+        raise BuildError(failures, results)
+    return results
@@ -0,0 +1,102 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+from static_sync import list_files
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only .gz siblings are written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt")
+COMPRESSED_SUFFIXES = (".gz", ".br")
+# Smaller files do not gain enough to be worth a second request path
+MIN_COMPRESS_SIZE = 256
+
+class CompressResult:
+    def __init__(self):
+        self.written = []
+        self.unchanged = 0
+        self.removed = []
+
+    def __repr__(self):
+        return f"CompressResult({len(self.written)} written, {self.unchanged} unchanged, {len(self.removed)} removed)"
+
+def compressors():
+    """
+    {sibling suffix: function compressing bytes} for the available formats.
+    gzip output has a fixed mtime so identical files compress identically.
+    """
+    available = {".gz": lambda data: gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        available[".br"] = lambda data: brotli.compress(data, quality=11)
+    return available
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def precompress_file(path, available):
+    """
+    Bring path's .gz/.br siblings up to date. A sibling carries its source's
+    mtime, so one whose mtime still matches is current and path is not even
+    read. Siblings that no longer pay off (a small file, or output that would
+    not be smaller) or whose format is unavailable are removed. Returns
+    (written, removed) sibling paths.
+    """
+    stat = os.stat(path)
+    data = None
+    written = []
+    removed = []
+    for suffix in COMPRESSED_SUFFIXES:
+        sibling = path + suffix
+        compress = available.get(suffix)
+        if compress is None or stat.st_size < MIN_COMPRESS_SIZE:
+            if _remove(sibling):
+                removed.append(sibling)
+            continue
+        try:
+            if os.stat(sibling).st_mtime_ns == stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            if _remove(sibling):
+                removed.append(sibling)
+            continue
+        tmp_path = f"{sibling}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, sibling)
+        written.append(sibling)
+    return written, removed
+
+def precompress_dir(directory, workers=8):
+    """
+    Write .gz (and, with the brotli module, .br) siblings next to every
+    text output in directory, so servers can send them as they are
+    (nginx gzip_static/brotli_static). Only files that changed since their
+    siblings were written are compressed, on a thread pool (zlib and brotli
+    release the GIL). Returns a CompressResult with paths relative to
+    directory.
+    """
+    result = CompressResult()
+    available = compressors()
+    paths = [os.path.join(directory, rel_path) for rel_path in sorted(list_files(directory))
+             if rel_path.endswith(COMPRESSIBLE_EXTENSIONS)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for written, removed in executor.map(lambda path: precompress_file(path, available), paths):
+            if not written and not removed:
+                result.unchanged += 1
+            result.written.extend(os.path.relpath(path, directory) for path in written)
+            result.removed.extend(os.path.relpath(path, directory) for path in removed)
+    return result
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+
+# The PageProfile being recorded in this process, or None when not profiling
+_current = None
+
+class PageProfile:
+    """
+    Per-stage timings for one page. stages maps a stage name to
+    [exclusive wall seconds, exclusive cpu seconds, calls]; time spent in a
+    nested stage (e.g. inline parsing inside block conversion) is only counted
+    against the inner stage. events holds (stage, start, duration) tuples for
+    trace output.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stages = {}
+        self.events = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.start = time.perf_counter()
+        self.wall = 0.0
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self._stack = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_stack"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._stack = []
+
+class _Stage:
+    __slots__ = ("profile", "name", "start", "cpu_start", "child_wall", "child_cpu")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.profile._stack.append(self)
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        cpu = time.thread_time() - self.cpu_start
+        profile = self.profile
+        profile._stack.pop()
+        if profile._stack:
+            parent = profile._stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+        totals = profile.stages.get(self.name)
+        if totals is None:
+            totals = profile.stages[self.name] = [0.0, 0.0, 0]
+        totals[0] += wall - self.child_wall
+        totals[1] += cpu - self.child_cpu
+        totals[2] += 1
+        profile.events.append((self.name, self.start, wall))
+        return False
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def stage(name):
+    """
+    Context manager timing a pipeline stage of the current page; a shared
+    no-op when profiling is off.
+    """
+    if _current is None:
+        return _NULL_STAGE
+    return _Stage(_current, name)
+
+def timed_iter(name, iterable):
+    """
+    Iterate, charging the time spent producing each item to stage name.
+    """
+    if _current is None:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+def _timed_iter(name, iterator):
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def begin_page(path):
+    global _current
+    _current = PageProfile(path)
+    return _current
+
+def end_page():
+    global _current
+    profile = _current
+    _current = None
+    if profile is not None:
+        profile.wall = time.perf_counter() - profile.start
+    return profile
+
+class BuildProfiler:
+    """
+    Collects PageProfiles from every page (and every worker) of a build.
+    """
+
+    def __init__(self):
+        self.pages = []
+
+    def add(self, page_profile):
+        if page_profile is not None:
+            self.pages.append(page_profile)
+
+    def stage_totals(self):
+        totals = {}
+        for page in self.pages:
+            for name, (wall, cpu, calls) in page.stages.items():
+                entry = totals.setdefault(name, [0.0, 0.0, 0])
+                entry[0] += wall
+                entry[1] += cpu
+                entry[2] += calls
+        return totals
+
+    def report(self, top=10):
+        totals = self.stage_totals()
+        total_wall = sum(entry[0] for entry in totals.values()) or 1.0
+        lines = [f"Profiled {len(self.pages)} page(s)", "",
+                 f"{'stage':<16}{'wall s':>10}{'cpu s':>10}{'calls':>9}{'share':>8}"]
+        for name, (wall, cpu, calls) in sorted(totals.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<16}{wall:>10.4f}{cpu:>10.4f}{calls:>9}{wall / total_wall:>8.1%}")
+        lines.extend(["", f"Slowest {min(top, len(self.pages))} page(s):",
+                      f"{'wall s':>10}{'in B':>10}{'out B':>10}  page"])
+        for page in sorted(self.pages, key=lambda p: -p.wall)[:top]:
+            lines.append(f"{page.wall:>10.4f}{page.bytes_in:>10}{page.bytes_out:>10}  {page.path}")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """
+        The build as a Chrome trace (chrome://tracing, Perfetto): one complete
+        event per page and per stage, one row per worker process.
+        """
+        if not self.pages:
+            return {"traceEvents": []}
+        origin = min(page.start for page in self.pages)
+        events = []
+        for page in self.pages:
+            events.append({
+                "name": page.path, "cat": "page", "ph": "X",
+                "ts": (page.start - origin) * 1e6, "dur": page.wall * 1e6,
+                "pid": page.pid, "tid": page.tid,
+                "args": {"bytes_in": page.bytes_in, "bytes_out": page.bytes_out},
+            })
+            for name, start, duration in page.events:
+                events.append({
+                    "name": name, "cat": "stage", "ph": "X",
+                    "ts": (start - origin) * 1e6, "dur": duration * 1e6,
+                    "pid": page.pid, "tid": page.tid,
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
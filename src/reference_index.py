@@ -0,0 +1,231 @@
+import json
+import os
+import posixpath
+import re
+from output_writer import save_json
+from textnode import TextType
+
+REFERENCES_PATH = os.path.join(".cache", "references.json")
+EXTERNAL_PREFIXES = ("http://", "https://", "mailto:", "tel:", "data:", "//", "#")
+TERM_PATTERN = re.compile(r"\w{2,}")
+SUMMARY_LENGTH = 200
+
+# The PageReferences being filled by the page currently rendering, if any
+_current = None
+
+class PageReferences:
+    """
+    What the renderer saw on one page: link and image targets, the title,
+    the front matter metadata and the page text. Text is recorded per block and folded into search terms
+    and a short summary by fold_text(), so a streamed page never holds more
+    than one block's text.
+    """
+
+    def __init__(self):
+        self.links = []
+        self.images = []
+        self.title = None
+        self.metadata = {}
+        self.text = []
+        self.terms = set()
+        self.summary = ""
+
+    def fold_text(self):
+        for piece in self.text:
+            self.terms.update(TERM_PATTERN.findall(piece.lower()))
+        if self.text and len(self.summary) < SUMMARY_LENGTH:
+            words = " ".join([self.summary] + self.text).split()
+            self.summary = " ".join(words)[:SUMMARY_LENGTH]
+        self.text = []
+
+def begin_collecting():
+    global _current
+    _current = PageReferences()
+    return _current
+
+def end_collecting():
+    global _current
+    refs = _current
+    _current = None
+    if refs is not None:
+        refs.fold_text()
+    return refs
+
+def record_references(text_nodes):
+    """
+    Note the link and image targets and the text among text_nodes (and
+    their nested children) on the page being rendered.
+    """
+    if _current is None:
+        return
+    for node in text_nodes:
+        if node.text_type == TextType.LINK:
+            _current.links.append(node.url)
+        elif node.text_type == TextType.IMAGE:
+            _current.images.append(node.url)
+            continue
+        if node.children:
+            record_references(node.children)
+        else:
+            _current.text.append(node.text)
+
+def record_text(text):
+    if _current is not None:
+        _current.text.append(text)
+
+def record_title(title):
+    if _current is not None:
+        _current.title = title
+
+def record_metadata(metadata):
+    if _current is not None:
+        _current.metadata = metadata
+
+def fold_text():
+    """
+    Mark the end of a block: fold its text into the page's terms and summary.
+    """
+    if _current is not None:
+        _current.fold_text()
+
+def reference_mark():
+    """
+    Position in the current page's references, for references_since.
+    """
+    if _current is None:
+        return None
+    return len(_current.links), len(_current.images), len(_current.text)
+
+def references_since(mark):
+    """
+    (links, images, text) recorded on the current page since
+    reference_mark(), within the current block.
+    """
+    if _current is None or mark is None:
+        return (), (), ()
+    return (tuple(_current.links[mark[0]:]), tuple(_current.images[mark[1]:]),
+            tuple(_current.text[mark[2]:]))
+
+def record_targets(links, images, text=()):
+    """
+    Replay what references_since returned, e.g. for a memoized block.
+    """
+    if _current is not None:
+        _current.links.extend(links)
+        _current.images.extend(images)
+        _current.text.extend(text)
+
+def snapshot_references():
+    """
+    The current page's links, images, search terms and summary as JSON-able
+    data, to be stored with its cached HTML; None when nothing is collecting.
+    """
+    if _current is None:
+        return None
+    _current.fold_text()
+    return {"links": list(_current.links), "images": list(_current.images),
+            "terms": sorted(_current.terms), "summary": _current.summary}
+
+def restore_references(snapshot):
+    """
+    Replay a snapshot_references() result, e.g. for a page rendered from cache.
+    """
+    if _current is not None:
+        _current.links.extend(snapshot["links"])
+        _current.images.extend(snapshot["images"])
+        _current.terms.update(snapshot["terms"])
+        _current.summary = snapshot["summary"]
+
+def page_url(rel_html_path):
+    """
+    "blog/tom/index.html" -> "/blog/tom", "index.html" -> "/".
+    """
+    path = "/" + rel_html_path.replace(os.sep, "/")
+    if path.endswith("/index.html"):
+        path = path[:-len("index.html")]
+    return normalize_url(path)
+
+def normalize_url(url):
+    return url.rstrip("/") or "/"
+
+def resolve_target(page, target):
+    """
+    The site-root path a reference on page points at, or None when it is
+    external or only a fragment.
+    """
+    if not target or target.startswith(EXTERNAL_PREFIXES) or ":" in target.split("/", 1)[0]:
+        return None
+    target = target.split("#", 1)[0].split("?", 1)[0]
+    if not target:
+        return None
+    if not target.startswith("/"):
+        base = page if page.endswith("/") else page + "/"
+        target = posixpath.join(base, target)
+    return normalize_url(posixpath.normpath(target))
+
+class ReferenceIndex:
+    """
+    Site-wide record of every page's outgoing links and the assets it uses,
+    built from the references the renderer sees and persisted between builds.
+
+    pages maps a page URL ("/blog/tom") to {"source": <markdown path>,
+    "links": [...], "images": [...]} with targets resolved to site-root paths.
+    """
+
+    def __init__(self, pages=None):
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path=REFERENCES_PATH):
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=REFERENCES_PATH):
+        save_json(path, self.pages)
+
+    def add_page(self, url, source, links, images):
+        resolved_links = [resolve_target(url, target) for target in links]
+        resolved_images = [resolve_target(url, target) for target in images]
+        self.pages[url] = {
+            "source": source,
+            "links": sorted({target for target in resolved_links if target}),
+            "images": sorted({target for target in resolved_images if target}),
+        }
+
+    def retain(self, urls):
+        """
+        Drop pages that are no longer part of the site.
+        """
+        urls = set(urls)
+        for url in list(self.pages):
+            if url not in urls:
+                del self.pages[url]
+
+    def broken_references(self, static_files=(), generated=()):
+        """
+        (page, target) pairs whose target is neither a page, a static file
+        (given relative to the static dir) nor another generated output such
+        as a listing page or feed.xml (given relative to the destination
+        dir), sorted.
+        """
+        known = set(self.pages)
+        known.update(normalize_url("/" + path.replace(os.sep, "/")) for path in static_files)
+        known.update(page_url(path) for path in generated)
+        broken = []
+        for url, entry in self.pages.items():
+            for target in entry["links"] + entry["images"]:
+                if target not in known:
+                    broken.append((url, target))
+        return sorted(broken)
+
+    def pages_using(self, target):
+        """
+        URLs of the pages that link to or embed target (a site-root path such
+        as "/images/tom.png"): the pages to rebuild when it changes.
+        """
+        target = normalize_url(target)
+        return sorted(url for url, entry in self.pages.items()
+                      if target in entry["images"] or target in entry["links"])
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "render")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Part of every key: bumped when the layout of an entry changes
+ENTRY_FORMAT = "2"
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def pack_entry(html, data=None):
+    """
+    One cache entry holding html and JSON-able data about it (such as the
+    page's references) on a first line of its own.
+    """
+    return json.dumps(data) + "\n" + html
+
+def unpack_entry(entry):
+    """
+    (html, data) from a pack_entry() result.
+    """
+    header, _, html = entry.partition("\n")
+    return html, json.loads(header)
+
+class RenderCache:
+    """
+    Content-addressed store of rendered HTML, keyed on the markdown text and
+    the converter version.
+
+    Entries live in directory as <key[:2]>/<key>.html and are safe to share
+    between concurrent worker processes (writes are atomic renames). Reads
+    refresh an entry's mtime so evict() can drop the least recently used
+    entries once the store grows past max_bytes. shared_dir is an optional
+    second store (e.g. a directory shared by CI runners) consulted on a local
+    miss and populated on every store. hits and misses are build-wide
+    totals collected with tally().
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, version="", max_bytes=DEFAULT_MAX_BYTES, shared_dir=None):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+        self.shared_dir = shared_dir
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markdown):
+        h = hashlib.sha256(ENTRY_FORMAT.encode())
+        h.update(b"\0")
+        h.update(self.version.encode())
+        h.update(b"\0")
+        h.update(markdown.encode())
+        return h.hexdigest()
+
+    def _path(self, root, key):
+        return os.path.join(root, key[:2], f"{key}.html")
+
+    def get(self, markdown):
+        key = self.key(markdown)
+        path = self._path(self.directory, key)
+        try:
+            with open(path, 'r') as f:
+                html = f.read()
+            os.utime(path)
+            return html
+        except OSError:
+            pass
+        if self.shared_dir:
+            shared_path = self._path(self.shared_dir, key)
+            try:
+                with open(shared_path, 'r') as f:
+                    html = f.read()
+                _atomic_write(path, html)
+                return html
+            except OSError:
+                pass
+        return None
+
+    def put(self, markdown, html):
+        key = self.key(markdown)
+        _atomic_write(self._path(self.directory, key), html)
+        if self.shared_dir:
+            try:
+                _atomic_write(self._path(self.shared_dir, key), html)
+            except OSError:
+                # A read-only or unavailable shared store must not fail the build
+                pass
+
+    def render(self, markdown, convert):
+        """
+        Return (html, hit): the cached HTML for markdown, or convert(markdown)
+        after storing it.
+        """
+        html = self.get(markdown)
+        if html is not None:
+            return html, True
+        html = convert(markdown)
+        self.put(markdown, html)
+        return html, False
+
+    def tally(self, outcomes):
+        """
+        Add hit/miss outcomes returned from (possibly remote) render() calls to
+        this cache's counters. Worker processes get a copy of the cache, so
+        counts are collected from their results rather than their counters.
+        """
+        for hit in outcomes:
+            if hit is True:
+                self.hits += 1
+            elif hit is False:
+                self.misses += 1
+
+    def evict(self):
+        """
+        Delete least recently used local entries until the store fits in max_bytes.
+        Returns the number of entries removed.
+        """
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+        removed = 0
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,324 @@
+import argparse
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from precompress import COMPRESSED_SUFFIXES
+from static_sync import list_files
+
+# Files up to this size are held in memory; larger ones are sent with sendfile
+MEMORY_LIMIT = 64 * 1024
+# Names written by the image pipeline and asset fingerprinting never change content
+FINGERPRINT_PATTERN = re.compile(r"\.[0-9a-f]{10}(-\d+w)?\.[^./]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+DEFAULT_CACHE = "public, max-age=3600"
+ENCODINGS = {".br": "br", ".gz": "gzip"}
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+class Representation:
+    """
+    One encoding of a served file: where it is, its size and ETag, and its
+    bytes when small enough to keep in memory.
+    """
+
+    __slots__ = ("path", "size", "mtime_ns", "etag", "body")
+
+    def __init__(self, path, encoding=None):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        suffix = f"-{encoding}" if encoding else ""
+        self.etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{suffix}"'
+        self.body = None
+        if stat.st_size <= MEMORY_LIMIT:
+            with open(path, 'rb') as f:
+                self.body = f.read()
+
+    def is_current(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+class ServedFile:
+    """
+    A file in the output tree with its precomputed response headers and its
+    identity, br and gzip representations (from .br/.gz siblings).
+    """
+
+    __slots__ = ("content_type", "cache_control", "representations")
+
+    def __init__(self, path, rel_path):
+        content_type, _ = mimetypes.guess_type(rel_path)
+        content_type = content_type or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/json", "application/xml",
+                                                                "image/svg+xml", "application/javascript"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        if FINGERPRINT_PATTERN.search(rel_path):
+            self.cache_control = IMMUTABLE_CACHE
+        elif rel_path.endswith(".html"):
+            self.cache_control = REVALIDATE_CACHE
+        else:
+            self.cache_control = DEFAULT_CACHE
+        identity = Representation(path)
+        self.representations = {None: identity}
+        for suffix in COMPRESSED_SUFFIXES:
+            if os.path.isfile(path + suffix):
+                encoding = ENCODINGS[suffix]
+                representation = Representation(path + suffix, encoding)
+                # precompress_dir gives siblings their source's mtime; any
+                # other sibling is stale
+                if representation.mtime_ns == identity.mtime_ns:
+                    self.representations[encoding] = representation
+
+    def is_current(self):
+        return all(representation.is_current() for representation in self.representations.values())
+
+    def choose(self, accept_encoding):
+        """
+        The encoding and representation to send for an Accept-Encoding
+        header, preferring br to gzip to none.
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.representations and encoding in accepted:
+                return encoding, self.representations[encoding]
+        return None, self.representations[None]
+
+def accepted_encodings(header):
+    accepted = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None when the header
+    should be ignored (several ranges, or not a byte range) and ValueError
+    when it cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+def etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in header.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+class OutputIndex:
+    """
+    In-memory index of an output tree, keyed by URL path ("/blog/tom/index.html").
+    Entries are built on startup and re-read when their files change on
+    disk, so the server can run against a tree that is being rebuilt.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+        self.lock = threading.Lock()
+        for rel_path in list_files(root):
+            if rel_path.endswith(COMPRESSED_SUFFIXES) or rel_path.endswith(".tmp"):
+                continue
+            self._add(rel_path)
+
+    def _add(self, rel_path):
+        url = "/" + rel_path.replace(os.sep, "/")
+        served = ServedFile(os.path.join(self.root, rel_path), rel_path)
+        with self.lock:
+            self.files[url] = served
+        return served
+
+    def paths(self):
+        return sorted(self.files)
+
+    def lookup(self, url):
+        """
+        The ServedFile for a normalized URL path, or None.
+        """
+        served = self.files.get(url)
+        if served is not None and served.is_current():
+            return served
+        rel_path = url.lstrip("/").replace("/", os.sep)
+        if not os.path.isfile(os.path.join(self.root, rel_path)):
+            if served is not None:
+                with self.lock:
+                    self.files.pop(url, None)
+            return None
+        return self._add(rel_path)
+
+    def is_dir(self, url):
+        return os.path.isdir(os.path.join(self.root, url.lstrip("/").replace("/", os.sep)))
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """
+    Serves an OutputIndex the way a production static host would: keep-alive,
+    ETag revalidation, single byte ranges, precompressed siblings and
+    long-lived caching for fingerprinted files.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits on the client's delayed ACK
+    disable_nagle_algorithm = True
+    server_version = "SiteServer"
+    index = None
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def respond(self, send_body):
+        url = posixpath.normpath(unquote(urlsplit(self.path).path))
+        if url.startswith("//"):
+            url = url[1:]
+        if not url.startswith("/") or "/../" in url + "/":
+            self.send_error(400)
+            return
+        trailing = self.path.split("?")[0].endswith("/")
+        if url != "/" and not trailing and self.index.is_dir(url):
+            self.send_response(301)
+            self.send_header("Location", url + "/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if trailing or url == "/":
+            url = url.rstrip("/") + "/index.html"
+        served = self.index.lookup(url)
+        if served is None:
+            self.send_not_found(send_body)
+            return
+
+        encoding, representation = served.choose(self.headers.get("Accept-Encoding"))
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and etag_matches(if_none_match, representation.etag):
+            self.send_response(304)
+            self.send_common_headers(served, representation, encoding)
+            self.end_headers()
+            return
+
+        start, end = 0, representation.size - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (if_range is None or if_range.strip() == representation.etag):
+            try:
+                byte_range = parse_range(range_header, representation.size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{representation.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+
+        self.send_response(status)
+        self.send_common_headers(served, representation, encoding)
+        self.send_header("Content-Type", served.content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{representation.size}")
+        self.end_headers()
+        if send_body and end >= start:
+            self.send_body(representation, start, end - start + 1)
+
+    def send_common_headers(self, served, representation, encoding):
+        self.send_header("ETag", representation.etag)
+        self.send_header("Cache-Control", served.cache_control)
+        self.send_header("Accept-Ranges", "bytes")
+        if len(served.representations) > 1:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+
+    def send_body(self, representation, offset, count):
+        if representation.body is not None:
+            self.wfile.write(representation.body[offset:offset + count])
+            return
+        with open(representation.path, 'rb') as f:
+            # socket.sendfile uses os.sendfile: the kernel copies straight
+            # from the page cache to the socket
+            self.connection.sendfile(f, offset, count)
+
+    def send_not_found(self, send_body):
+        served = self.index.lookup("/404.html")
+        body = served.representations[None].body if served is not None else None
+        if body is None:
+            body = b"Not Found\n"
+        self.send_response(404)
+        self.send_header("Content-Type", "text/html; charset=utf-8" if served else "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", REVALIDATE_CACHE)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+class PreviewServer(ThreadingHTTPServer):
+    # Deep enough that a load test's connection burst is not refused
+    request_queue_size = 128
+
+    def __init__(self, address, root, quiet=False):
+        self.quiet = quiet
+        handler = type("Handler", (PreviewHandler,), {"index": OutputIndex(root)})
+        super().__init__(address, handler)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Serve docs/ with production-style caching and compression")
+    parser.add_argument("directory", nargs="?", default="docs", help="output tree to serve")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--bind", default="", help="address to listen on (default: all)")
+    parser.add_argument("--quiet", action="store_true", help="do not log requests")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    server = PreviewServer((args.bind, args.port), args.directory, args.quiet)
+    print(f"Serving {args.directory}/ on http://localhost:{server.server_address[1]} "
+          f"({len(server.RequestHandlerClass.index.files)} files indexed)")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import calendar
+import datetime
+import html
+import json
+import os
+import time
+from xml.sax.saxutils import escape, quoteattr
+from build_manifest import hash_bytes, remove_file_and_empty_parents
+from compiled_template import apply_basepath
+from front_matter import tag_slug
+from output_writer import save_json, write_output
+from reference_index import page_url
+
+SITE_INDEX_PATH = os.path.join(".cache", "site.json")
+SITE_INDEX_VERSION = 2
+SEARCH_INDEX_NAME = "search-index.json"
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+FEED_SECTION = "/blog/"
+FEED_ENTRIES = 20
+TAGS_URL = "/tags"
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+def _published(page):
+    """
+    When a page was published, from its front matter date; None when it has
+    none. Source mtimes are not used: a fresh checkout would change them all.
+    """
+    if page.get("date"):
+        return calendar.timegm(datetime.date.fromisoformat(page["date"]).timetuple())
+    return None
+
+class SiteIndex:
+    """
+    Per-page metadata the build already has (title, summary, search terms,
+    front matter date and tags), persisted between builds so
+    incremental builds only update the pages they re-render. The sitemap,
+    the feed, the search index and the listing pages are all generated from
+    it without reading docs/ or the markdown back.
+
+    pages maps a page URL ("/blog/tom") to {"source", "title", "summary",
+    "terms", "date", "tags"}. listings maps each generated
+    listing page (relative to the destination dir) to a hash of what it
+    showed, so it is only rendered again when that changes.
+    """
+
+    def __init__(self, pages=None, listings=None):
+        self.pages = pages if pages is not None else {}
+        self.listings = listings if listings is not None else {}
+
+    @classmethod
+    def load(cls, path=SITE_INDEX_PATH):
+        # A missing or outdated index just means its pages are rebuilt
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != SITE_INDEX_VERSION:
+            return cls()
+        return cls(data["pages"], data["listings"])
+
+    def save(self, path=SITE_INDEX_PATH):
+        save_json(path, {"version": SITE_INDEX_VERSION, "pages": self.pages, "listings": self.listings})
+
+    def add_results(self, results, dest_dir):
+        for result in results:
+            self.pages[page_url(os.path.relpath(result.output, dest_dir))] = {
+                "source": result.source,
+                "title": result.title,
+                "summary": result.summary,
+                "terms": list(result.terms),
+                "date": result.metadata.get("date"),
+                "tags": result.metadata.get("tags", []),
+            }
+
+    def retain(self, urls):
+        urls = set(urls)
+        for url in list(self.pages):
+            if url not in urls:
+                del self.pages[url]
+
+    def search_index(self, basepath="/"):
+        """
+        A compact inverted index: "pages" lists [url, title] pairs and
+        "terms" maps each term to the sorted indexes of the pages using it.
+        """
+        urls = sorted(self.pages)
+        terms = {}
+        for i, url in enumerate(urls):
+            for term in self.pages[url]["terms"]:
+                terms.setdefault(term, []).append(i)
+        return {
+            "pages": [[public_path(url, basepath), self.pages[url]["title"]] for url in urls],
+            "terms": dict(sorted(terms.items())),
+        }
+
+    def sitemap(self, site_url, basepath="/"):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for url in sorted(self.pages):
+            line = f"<url><loc>{escape(absolute_url(site_url, basepath, url))}</loc>"
+            published = _published(self.pages[url])
+            if published is not None:
+                line += f"<lastmod>{_timestamp(published)}</lastmod>"
+            lines.append(line + "</url>")
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def feed(self, site_url, basepath="/", section=FEED_SECTION, limit=FEED_ENTRIES):
+        """
+        An Atom feed of the newest pages under section, titled after the
+        home page. Undated pages come last and carry the feed's own
+        updated time, the newest date among the entries.
+        """
+        entries = self.by_date(url for url in self.pages if url.startswith(section))[:limit]
+        home = absolute_url(site_url, basepath, "/")
+        title = self.pages.get("/", {}).get("title") or site_url
+        updated = max((_published(self.pages[url]) or 0 for url in entries), default=0)
+        lines = ['<?xml version="1.0" encoding="utf-8"?>',
+                 '<feed xmlns="http://www.w3.org/2005/Atom">',
+                 f"<title>{escape(title)}</title>",
+                 f"<link href={quoteattr(home)}/>",
+                 f"<link rel=\"self\" href={quoteattr(home + FEED_NAME)}/>",
+                 f"<id>{escape(home)}</id>",
+                 f"<updated>{_timestamp(updated)}</updated>"]
+        for url in entries:
+            page = self.pages[url]
+            link = absolute_url(site_url, basepath, url)
+            lines.append(f"<entry><title>{escape(page['title'] or url)}</title>"
+                         f"<link href={quoteattr(link)}/><id>{escape(link)}</id>"
+                         f"<updated>{_timestamp(_published(page) or updated)}</updated>"
+                         f"<summary>{escape(page['summary'])}</summary></entry>")
+        lines.append("</feed>")
+        return "\n".join(lines) + "\n"
+
+    def by_date(self, urls):
+        """
+        urls sorted newest first by publication date, then by URL, with
+        undated pages last.
+        """
+        return sorted(urls, key=lambda url: (-(_published(self.pages[url]) or 0), url))
+
+    def tags(self):
+        """
+        {tag slug: (tag name, page URLs newest first)} over every page.
+        """
+        names = {}
+        members = {}
+        for url, page in sorted(self.pages.items()):
+            for tag in page.get("tags", ()):
+                slug = tag_slug(tag)
+                if slug:
+                    names.setdefault(slug, tag)
+                    members.setdefault(slug, []).append(url)
+        return {slug: (names[slug], self.by_date(urls)) for slug, urls in sorted(members.items())}
+
+    def listing_pages(self):
+        """
+        The listing pages the index implies, as {output path relative to the
+        destination dir: (template name, title, [(url, title, date)])}: a
+        page per tag and one listing every tag under /tags/, and a page
+        listing each section (e.g. /blog/) that has no index page of its own.
+        Pages from the content dir always take precedence.
+        """
+        listings = {}
+
+        def add(url, template, title, entries):
+            if url not in self.pages:
+                rel_path = os.path.join(*url.strip("/").split("/"), "index.html")
+                listings[rel_path] = (template, title, entries)
+
+        def entries(urls):
+            return [[url, self.pages[url]["title"] or url, self.pages[url].get("date")] for url in urls]
+
+        tags = self.tags()
+        if tags:
+            add(TAGS_URL, "tags", "Tags",
+                [[f"{TAGS_URL}/{slug}", f"{name} ({len(urls)})", None] for slug, (name, urls) in tags.items()])
+            for slug, (name, urls) in tags.items():
+                add(f"{TAGS_URL}/{slug}", "tags", f"Tagged {name}", entries(urls))
+
+        sections = {}
+        for url in self.pages:
+            if url.count("/") > 1:
+                sections.setdefault("/" + url.split("/")[1], []).append(url)
+        for section, urls in sorted(sections.items()):
+            add(section, section.strip("/"), section.strip("/").replace("-", " ").capitalize(),
+                entries(self.by_date(urls)))
+        return listings
+
+def listing_html(title, entries):
+    items = []
+    for url, label, date in entries:
+        item = f'<li><a href="{html.escape(public_path(url))}">{html.escape(label)}</a>'
+        if date:
+            item += f' <time datetime="{date}">{date}</time>'
+        items.append(item + "</li>")
+    return f"<div><h1>{html.escape(title)}</h1><ul>{''.join(items)}</ul></div>"
+
+def write_listings(index, templates, dest_dir):
+    """
+    Render index.listing_pages() into dest_dir with templates (a
+    TemplateSet; each section's template as for its pages). A listing is
+    only rendered when its entries or its template changed since the hash in
+    index.listings, and listings that are no longer implied are deleted
+    (unless a content page now owns their URL).
+    Returns (written, removed) paths relative to dest_dir.
+    """
+    pages = index.listing_pages()
+    written = []
+    removed = []
+    for rel_path, (name, title, entries) in sorted(pages.items()):
+        template = templates.get(name)
+        digest = hash_bytes(json.dumps([template.segments, title, entries]).encode("utf-8"))
+        path = os.path.join(dest_dir, rel_path)
+        if index.listings.get(rel_path) == digest and os.path.exists(path):
+            continue
+        content = apply_basepath(listing_html(title, entries), template.basepath, template.assets)
+        if write_output(path, template.render(Title=html.escape(title), Content=content)):
+            written.append(rel_path)
+        index.listings[rel_path] = digest
+    for rel_path in sorted(index.listings):
+        if rel_path not in pages:
+            del index.listings[rel_path]
+            path = os.path.join(dest_dir, rel_path)
+            # A content page that took over the URL has already replaced the file
+            if page_url(rel_path) not in index.pages and os.path.exists(path):
+                remove_file_and_empty_parents(path, dest_dir)
+                removed.append(rel_path)
+    return written, removed
+
+def public_path(url, basepath="/"):
+    """
+    "/blog/tom" -> "<basepath>blog/tom/", the path a page is served at.
+    """
+    path = basepath.rstrip("/") + url
+    return path if path.endswith("/") else path + "/"
+
+def absolute_url(site_url, basepath, url):
+    return site_url.rstrip("/") + public_path(url, basepath)
+
+def site_outputs(site_url=None, search=False):
+    """
+    The files (relative to the destination dir) write_site_outputs will
+    produce, so the static sync keeps them.
+    """
+    outputs = []
+    if site_url:
+        outputs.extend([SITEMAP_NAME, FEED_NAME])
+    if search:
+        outputs.append(SEARCH_INDEX_NAME)
+    return outputs
+
+def write_site_outputs(index, dest_dir, basepath="/", site_url=None, search=False):
+    """
+    Write the sitemap and feed (given site_url) and the search index into
+    dest_dir, skipping files whose content is unchanged. Returns the paths
+    written, relative to dest_dir.
+    """
+    contents = {}
+    if site_url:
+        contents[SITEMAP_NAME] = index.sitemap(site_url, basepath)
+        contents[FEED_NAME] = index.feed(site_url, basepath)
+    if search:
+        contents[SEARCH_INDEX_NAME] = json.dumps(index.search_index(basepath), separators=(",", ":"))
+    written = []
+    for name, content in contents.items():
+        if write_output(os.path.join(dest_dir, name), content):
+            written.append(name)
+    return written
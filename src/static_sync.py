@@ -0,0 +1,132 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from build_manifest import hash_file, remove_file_and_empty_parents
+from output_writer import write_output
+
+class SyncResult:
+    def __init__(self):
+        self.copied = []
+        self.unchanged = 0
+        self.removed = []
+
+    def __repr__(self):
+        return f"SyncResult({len(self.copied)} copied, {self.unchanged} unchanged, {len(self.removed)} removed)"
+
+def list_files(directory):
+    """
+    Relative paths of every file under directory.
+    """
+    files = []
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), directory))
+    return files
+
+def is_up_to_date(src_path, dst_path, use_hash=False):
+    try:
+        src_stat = os.stat(src_path)
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if use_hash:
+        return hash_file(src_path) == hash_file(dst_path)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+def _copy_contents(src_path, dst_path):
+    # copy_file_range lets the kernel copy (or reflink, on btrfs/XFS) without
+    # going through user space; fall back to shutil where it is unsupported
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining == 0:
+                    return
+        except OSError:
+            pass
+    shutil.copyfile(src_path, dst_path)
+
+def sync_file(src_path, dst_path, link=False):
+    """
+    Atomically replace dst_path with src_path's contents, keeping its mtime so
+    the next sync can tell the two are identical. With link=True a hardlink is
+    tried first. Writing to a temporary name and renaming never writes through
+    an existing hardlink.
+    """
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+    if link:
+        try:
+            os.link(src_path, tmp_path)
+            os.replace(tmp_path, dst_path)
+            return
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    _copy_contents(src_path, tmp_path)
+    shutil.copystat(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+def transform_file(src_path, dst_path, transform):
+    """
+    Write transform(text of src_path) to dst_path unless it already holds
+    exactly that. Returns whether dst_path was written.
+    """
+    with open(src_path, 'r', encoding="utf-8") as f:
+        text = transform(f.read())
+    return write_output(dst_path, text)
+
+def sync_dir(src, dst, keep=(), use_hash=False, link=False, workers=8, transforms=None,
+             sibling_suffixes=()):
+    """
+    Make dst mirror the files in src, copying only new or changed files.
+
+    Files are compared by size and mtime, or by content hash when use_hash is
+    set. transforms maps file extensions to functions applied to the text of
+    those files (e.g. minifiers); their output is compared with dst instead.
+    Files in dst that are not in src are deleted unless their path relative
+    to dst is in keep (e.g. generated pages), or is a kept file's path plus
+    one of sibling_suffixes (e.g. precompressed ".gz" copies). Copies run on
+    a thread pool. Returns a SyncResult.
+    """
+    result = SyncResult()
+    os.makedirs(dst, exist_ok=True)
+    src_files = list_files(src)
+    transforms = transforms or {}
+
+    def sync_one(rel_path):
+        src_path = os.path.join(src, rel_path)
+        dst_path = os.path.join(dst, rel_path)
+        transform = transforms.get(os.path.splitext(rel_path)[1].lower())
+        if transform is not None:
+            return transform_file(src_path, dst_path, transform)
+        if is_up_to_date(src_path, dst_path, use_hash):
+            return False
+        sync_file(src_path, dst_path, link)
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for rel_path, copied in zip(src_files, executor.map(sync_one, src_files)):
+            if copied:
+                result.copied.append(rel_path)
+            else:
+                result.unchanged += 1
+
+    wanted = set(src_files) | set(keep)
+    for rel_path in list_files(dst):
+        base, suffix = os.path.splitext(rel_path)
+        if suffix in sibling_suffixes and base in wanted:
+            continue
+        if rel_path not in wanted:
+            remove_file_and_empty_parents(os.path.join(dst, rel_path), dst)
+            result.removed.append(rel_path)
+    result.copied.sort()
+    result.removed.sort()
+    return result
@@ -0,0 +1,97 @@
+import os
+import random
+
+WORDS = (
+    "the ring hobbit shire elf wizard road mountain river forest song tale "
+    "king shadow light star ancient journey friend council gate tower "
+    "dragon silver gold key stone path fellowship return"
+).split()
+
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 6,
+    "heading": 1,
+    "code": 1,
+    "quote": 1,
+    "unordered_list": 1,
+    "ordered_list": 1,
+}
+
+def _words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def inline_text(rng, word_count, markup_density):
+    """
+    A line of prose where roughly markup_density of the words carry inline
+    markup (bold, italic, code, link or image).
+    """
+    parts = []
+    for _ in range(word_count):
+        word = rng.choice(WORDS)
+        if rng.random() < markup_density:
+            kind = rng.randrange(5)
+            if kind == 0:
+                word = f"**{word}**"
+            elif kind == 1:
+                word = f"_{word}_"
+            elif kind == 2:
+                word = f"`{word}`"
+            elif kind == 3:
+                word = f"[{word}](/blog/{rng.choice(WORDS)})"
+            else:
+                word = f"![{word}](/images/{rng.choice(WORDS)}.png)"
+        parts.append(word)
+    return " ".join(parts)
+
+def make_block(rng, block_type, markup_density):
+    if block_type == "heading":
+        return "#" * rng.randint(2, 6) + " " + inline_text(rng, rng.randint(2, 6), markup_density)
+    if block_type == "code":
+        lines = [f"{rng.choice(WORDS)} = {_words(rng, 3)!r}" for _ in range(rng.randint(2, 8))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if block_type == "quote":
+        return "\n".join("> " + inline_text(rng, rng.randint(5, 15), markup_density)
+                         for _ in range(rng.randint(1, 4)))
+    if block_type == "unordered_list":
+        return "\n".join("- " + inline_text(rng, rng.randint(3, 10), markup_density)
+                         for _ in range(rng.randint(2, 6)))
+    if block_type == "ordered_list":
+        return "\n".join(f"{i}. " + inline_text(rng, rng.randint(3, 10), markup_density)
+                         for i in range(1, rng.randint(2, 6) + 1))
+    return "\n".join(inline_text(rng, rng.randint(8, 20), markup_density)
+                     for _ in range(rng.randint(1, 5)))
+
+def generate_markdown(rng, size, block_mix=None, markup_density=0.1):
+    """
+    A page of roughly size characters: an h1 title followed by blocks drawn
+    from block_mix (block type name -> relative weight).
+    """
+    mix = block_mix or DEFAULT_BLOCK_MIX
+    types = list(mix)
+    weights = [mix[t] for t in types]
+    blocks = ["# " + _words(rng, 4)]
+    length = len(blocks[0])
+    while length < size:
+        block = make_block(rng, rng.choices(types, weights)[0], markup_density)
+        blocks.append(block)
+        length += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+def write_corpus(content_dir, pages, page_size, block_mix=None, markup_density=0.1, seed=0):
+    """
+    Write `pages` generated index.md files under content_dir, spread over
+    nested section directories. The same seed always produces the same corpus.
+    Returns the number of bytes written.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for i in range(pages):
+        if i == 0:
+            page_dir = content_dir
+        else:
+            page_dir = os.path.join(content_dir, f"section{i % 10}", f"page{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        markdown = generate_markdown(rng, page_size, block_mix, markup_density)
+        with open(os.path.join(page_dir, "index.md"), 'w') as f:
+            f.write(markdown)
+        total += len(markdown)
+    return total
@@ -0,0 +1,1244 @@
+import gzip
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import tracemalloc
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from main import collect_pages, incremental_build, generate_pages_recursive, render_page, stream_page
+from parallel_build import BuildError
+from compiled_template import CompiledTemplate, TemplateSet, apply_basepath
+from render_cache import RenderCache, unpack_entry
+from markdown_to_html import markdown_to_html_node
+from block_parser import iter_blocks
+from block_types import BlockType
+from static_sync import sync_dir
+from synthetic_corpus import generate_markdown, write_corpus
+from benchmark import micro_benchmarks, macro_benchmarks
+from profiling import BuildProfiler, begin_page, end_page, stage
+from reference_index import ReferenceIndex, page_url, resolve_target
+from dependency_graph import DependencyGraph
+from pipelined_build import run_pipeline, scan_ahead
+from block_memo import BlockMemo
+from minify import minify_css, minify_html
+from precompress import MIN_COMPRESS_SIZE, precompress_dir
+from asset_manifest import fingerprint_assets
+from image_pipeline import Image, ImageInfo, ImageSet, image_size, process_images
+from site_index import SiteIndex, site_outputs, write_listings, write_site_outputs
+from front_matter import parse_front_matter, read_front_matter, tag_slug
+from output_writer import OutputChanges, OutputFile, write_output
+from serve import MEMORY_LIMIT, PreviewServer, parse_range
+from load_test import run_load_test, site_paths
+from watch import SiteWatcher, changed_paths, inject_reload_script, snapshot
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+def read_file(path):
+    with open(path, 'r') as f:
+        return f.read()
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".cache", "manifest.json")
+        self.templates_dir = os.path.join(self.root, "templates")
+        self.graph = os.path.join(self.root, ".cache", "dependencies.json")
+        write_file(self.template, TEMPLATE)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nA **post**")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def build(self, basepath="/", **kwargs):
+        with redirect_stdout(StringIO()):
+            return incremental_build(self.content, self.static, self.template,
+                                     self.dest, basepath, self.manifest,
+                                     templates_dir=self.templates_dir, graph_path=self.graph, **kwargs)
+
+class TestIncrementalBuild(SiteTestCase):
+    def test_collect_pages_sorted(self):
+        pages = collect_pages(self.content, self.dest)
+        self.assertEqual(
+            pages,
+            [
+                (os.path.join(self.content, "blog", "post", "index.md"),
+                 os.path.join(self.dest, "blog", "post", "index.html")),
+                (os.path.join(self.content, "index.md"),
+                 os.path.join(self.dest, "index.html")),
+            ],
+        )
+
+    def test_first_build_renders_everything(self):
+        regenerated = self.build()
+        self.assertEqual(len(regenerated), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css")))
+        self.assertIn("<b>post</b>", read_file(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_unchanged_build_renders_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), [])
+
+    def test_only_changed_page_rerendered(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        self.assertEqual(self.build(), [os.path.join(self.content, "index.md")])
+        self.assertIn("Edited", read_file(os.path.join(self.dest, "index.html")))
+
+    def test_unchanged_size_and_mtime_skip_reading(self):
+        self.build()
+        md_path = os.path.join(self.content, "index.md")
+        stat = os.stat(md_path)
+        write_file(md_path, "# Home\n\nWelcomE")
+        os.utime(md_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        # Same size and mtime: the file is taken as unchanged without being read
+        self.assertEqual(self.build(), [])
+        os.utime(md_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(self.build(), [md_path])
+        self.assertIn("WelcomE", read_file(os.path.join(self.dest, "index.html")))
+
+    def test_template_or_basepath_change_rebuilds_all(self):
+        self.build()
+        self.assertEqual(len(self.build(basepath="/site/")), 2)
+        write_file(self.template, TEMPLATE + "\n")
+        self.assertEqual(len(self.build(basepath="/site/")), 2)
+
+    def test_full_build_records_what_it_built(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.build()
+        self.assertEqual(len(self.build("/X/", full=True)), 2)
+        self.assertIn('href="/X/blog/post"', read_file(os.path.join(self.dest, "index.html")))
+        # The next incremental build knows the output is for /X/
+        self.assertEqual(len(self.build()), 2)
+        self.assertIn('href="/blog/post"', read_file(os.path.join(self.dest, "index.html")))
+        self.assertEqual(len(self.build(full=True, minify=True)), 2)
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(self.build(), [])
+
+    def test_deleted_sources_are_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_asset_change_rebuilds_only_pages_using_it(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n![logo](/logo.png)")
+        write_file(os.path.join(self.static, "logo.png"), "v1")
+        self.build()
+        write_file(os.path.join(self.static, "logo.png"), "v2")
+        self.assertEqual(self.build(), [os.path.join(self.content, "index.md")])
+
+    def test_named_template_edit_rebuilds_only_its_section(self):
+        write_file(os.path.join(self.templates_dir, "blog.html"), "BLOG {{ Title }} {{ Content }}")
+        self.build()
+        write_file(os.path.join(self.templates_dir, "blog.html"), "BLOG2 {{ Title }} {{ Content }}")
+        self.assertEqual(self.build(), [os.path.join(self.content, "blog", "post", "index.md")])
+        self.assertTrue(read_file(os.path.join(self.dest, "blog", "post", "index.html")).startswith("BLOG2"))
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_affected_and_remove_output(self):
+        graph = DependencyGraph("/", {"a.html": ["a.md", "t.html"], "b.html": ["b.md", "t.html"]})
+        self.assertEqual(graph.affected(["t.html"]), ["a.html", "b.html"])
+        self.assertEqual(graph.affected(["b.md", "missing"]), ["b.html"])
+        graph.remove_output("a.html")
+        self.assertEqual(graph.affected(["t.html", "a.md"]), ["b.html"])
+
+    def test_set_inputs_replaces_old_edges(self):
+        graph = DependencyGraph()
+        graph.set_inputs("a.html", ["a.md", "old.css"])
+        graph.set_inputs("a.html", ["a.md", "new.css"])
+        self.assertEqual(graph.affected(["old.css"]), [])
+        self.assertEqual(graph.affected(["new.css"]), ["a.html"])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "deps.json")
+            DependencyGraph("/site/", {"a.html": ["a.md"]}).save(path)
+            graph = DependencyGraph.load(path)
+            self.assertEqual((graph.basepath, graph.outputs), ("/site/", {"a.html": ["a.md"]}))
+            self.assertEqual(DependencyGraph.load(os.path.join(root, "missing.json")).outputs, {})
+
+class TestParallelBuild(SiteTestCase):
+    def generate(self, dest, jobs):
+        with redirect_stdout(StringIO()) as out:
+            generate_pages_recursive(self.content, self.template, dest, "/", jobs=jobs,
+                                     templates_dir=self.templates_dir)
+        return out.getvalue()
+
+    def test_parallel_output_matches_serial(self):
+        serial_dest = os.path.join(self.root, "serial")
+        parallel_dest = os.path.join(self.root, "parallel")
+        serial_log = self.generate(serial_dest, 1)
+        parallel_log = self.generate(parallel_dest, 2)
+        for rel in ("index.html", os.path.join("blog", "post", "index.html")):
+            self.assertEqual(read_file(os.path.join(serial_dest, rel)),
+                             read_file(os.path.join(parallel_dest, rel)))
+        self.assertEqual(serial_log.replace(serial_dest, ""), parallel_log.replace(parallel_dest, ""))
+
+    def test_failures_are_aggregated(self):
+        write_file(os.path.join(self.content, "index.md"), "no title")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "still no title")
+        for jobs in (1, 2):
+            with self.assertRaises(BuildError) as ctx:
+                self.generate(self.dest, jobs)
+            self.assertEqual(len(ctx.exception.failures), 2)
+
+    def test_invalid_front_matter_is_a_page_failure(self):
+        bad = os.path.join(self.content, "blog", "post", "index.md")
+        write_file(bad, "---\ndate: soon\n---\n# Post")
+        for jobs in (1, 2):
+            with self.assertRaises(BuildError) as ctx:
+                self.generate(self.dest, jobs)
+            self.assertEqual([path for path, _ in ctx.exception.failures], [bad])
+            self.assertIn("Invalid front matter date", ctx.exception.failures[0][1])
+            self.assertEqual(len(ctx.exception.results), 1)
+        with self.assertRaises(BuildError):
+            self.build()
+
+    def test_failed_page_retried_by_next_incremental_build(self):
+        write_file(os.path.join(self.content, "index.md"), "no title")
+        with self.assertRaises(BuildError):
+            self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Fixed")
+        self.assertEqual(self.build(), [os.path.join(self.content, "index.md")])
+
+class TestBlockMemo(SiteTestCase):
+    FOOTER = "Disclaimer: see [the terms](/terms) and ![seal](/seal.png)"
+
+    def test_lru_eviction_and_stats(self):
+        memo = BlockMemo(2)
+        memo.put("a", 1)
+        memo.put("b", 2)
+        self.assertEqual(memo.get("a"), 1)
+        memo.put("c", 3)
+        self.assertIsNone(memo.get("b"))
+        self.assertEqual((memo.get("a"), memo.get("c")), (1, 3))
+        self.assertEqual((memo.hits, memo.misses, memo.evictions), (3, 1, 1))
+
+    def test_byte_bound_and_oversized_blocks(self):
+        memo = BlockMemo(100, max_bytes=10, max_block_bytes=6)
+        memo.put("a", 1, 4)
+        memo.put("b", 2, 4)
+        memo.put("huge", 3, 7)
+        self.assertIsNone(memo.get("huge"))
+        memo.put("c", 4, 4)
+        self.assertIsNone(memo.get("a"))
+        self.assertEqual((memo.get("b"), memo.get("c"), memo.bytes), (2, 4, 8))
+        memo.put("c", 5, 2)
+        self.assertEqual((memo.get("c"), memo.bytes), (5, 6))
+
+    def test_repeated_blocks_rendered_once(self):
+        for name in ("a", "b", "c"):
+            write_file(os.path.join(self.content, name, "index.md"), f"# {name}\n\n{self.FOOTER}")
+        plain_dest = os.path.join(self.root, "plain")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, plain_dest, "/", templates_dir=None)
+            for jobs in (1, 2):
+                references = ReferenceIndex()
+                results = generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=jobs,
+                                                   templates_dir=None, references=references, memo_size=64)
+                self.assertEqual(references.pages["/c"]["links"], ["/terms"])
+                self.assertEqual(references.pages["/c"]["images"], ["/seal.png"])
+                if jobs == 1:
+                    # The footer is parsed for page a and reused for b and c
+                    self.assertGreaterEqual(sum(result.memo_hits for result in results), 2)
+        for md_path, html_path in collect_pages(self.content, self.dest):
+            rel = os.path.relpath(html_path, self.dest)
+            self.assertEqual(read_file(html_path), read_file(os.path.join(plain_dest, rel)))
+
+class TestSiteIndex(SiteTestCase):
+    def build_site(self, site, **kwargs):
+        with redirect_stdout(StringIO()):
+            incremental_build(self.content, self.static, self.template, self.dest, "/site/", self.manifest,
+                              templates_dir=self.templates_dir, graph_path=self.graph, site=site,
+                              keep_outputs=site_outputs("https://example.com", True), **kwargs)
+            return write_site_outputs(site, self.dest, "/site/", "https://example.com", True)
+
+    def test_outputs_from_build_data(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to the _Shire_")
+        site = SiteIndex()
+        self.assertEqual(sorted(self.build_site(site)), ["feed.xml", "search-index.json", "sitemap.xml"])
+        with open(os.path.join(self.dest, "search-index.json")) as f:
+            index = json.load(f)
+        self.assertEqual(index["pages"], [["/site/", "Home"], ["/site/blog/post/", "Post"]])
+        self.assertEqual(index["terms"]["shire"], [0])
+        self.assertEqual(index["terms"]["post"], [1])
+        self.assertIn("<loc>https://example.com/site/blog/post/</loc>", read_file(os.path.join(self.dest, "sitemap.xml")))
+        feed = read_file(os.path.join(self.dest, "feed.xml"))
+        self.assertIn("<title>Home</title>", feed)
+        self.assertEqual(feed.count("<entry>"), 1)
+        self.assertIn("<summary>Post A post</summary>", feed)
+        # Nothing changed: nothing rewritten, and the static sync kept the files
+        self.assertEqual(self.build_site(site), [])
+
+    def test_dates_come_from_front_matter_only(self):
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "---\ndate: 2024-01-02\n---\n# Post")
+        site = SiteIndex()
+        self.build_site(site)
+        sitemap = read_file(os.path.join(self.dest, "sitemap.xml"))
+        self.assertIn("<loc>https://example.com/site/</loc></url>", sitemap)
+        self.assertIn("<lastmod>2024-01-02T00:00:00Z</lastmod>", sitemap)
+        self.assertIn("<updated>2024-01-02T00:00:00Z</updated>", read_file(os.path.join(self.dest, "feed.xml")))
+        # A fresh checkout gives every source a new mtime; the outputs stay the same
+        for md_path, _ in collect_pages(self.content, self.dest):
+            os.utime(md_path, (1, 1))
+        site = SiteIndex()
+        self.assertEqual(self.build_site(site), [])
+
+    def test_index_grows_incrementally(self):
+        site = SiteIndex()
+        self.build_site(site)
+        write_file(os.path.join(self.content, "new", "index.md"), "# New\n\nFresh words")
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.build_site(site)
+        self.assertEqual(sorted(site.pages), ["/", "/new"])
+        self.assertIn("fresh", site.pages["/new"]["terms"])
+
+    def test_cached_pages_index_the_same_terms(self):
+        cache = RenderCache(os.path.join(self.root, "render"))
+        write_file(os.path.join(self.content, "index.md"),
+                   "# Home\n\n- **Bold** [link](/x) ![seal](/seal.png)\n\n```\ncode_word\n```")
+        terms = []
+        for _ in range(2):
+            with redirect_stdout(StringIO()):
+                results = generate_pages_recursive(self.content, self.template, self.dest, "/",
+                                                   templates_dir=None, cache=cache)
+            terms.append([(result.terms, result.summary, result.links, result.images) for result in results])
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(terms[0], terms[1])
+        self.assertIn("code_word", terms[0][1][0])
+        # Hits replay the references stored beside the HTML instead of parsing the page again
+        html, references = unpack_entry(cache.get("# Home\n\n- **Bold** [link](/x) ![seal](/seal.png)\n\n"
+                                                  "```\ncode_word\n```"))
+        self.assertEqual((references["links"], references["images"]), (["/x"], ["/seal.png"]))
+        self.assertIn("code_word", references["terms"])
+
+class TestFrontMatter(SiteTestCase):
+    def test_parse_front_matter(self):
+        metadata, body = parse_front_matter(
+            "---\ntitle: \"Hello: world\"\ndate: 2024-03-01\ntags: [Lore, 'Middle-earth', Lore]\n"
+            "draft: yes\n# comment\nauthor: Tom\n---\n# Heading\n")
+        self.assertEqual(metadata, {"title": "Hello: world", "date": "2024-03-01", "tags": ["Lore", "Middle-earth"],
+                                    "draft": True, "author": "Tom"})
+        self.assertEqual(body, "# Heading\n")
+        self.assertEqual(parse_front_matter("# Plain\n"), ({}, "# Plain\n"))
+        self.assertEqual(parse_front_matter("---\nnot closed\n"), ({}, "---\nnot closed\n"))
+        with self.assertRaises(ValueError):
+            parse_front_matter("---\ndate: someday\n---\n")
+        self.assertEqual(tag_slug("Middle-earth Lore!"), "middle-earth-lore")
+
+    def test_read_front_matter_stops_at_body(self):
+        path = os.path.join(self.root, "page.md")
+        write_file(path, "---\ntags: a, b\n---\n# Title\n")
+        with open(path) as f:
+            self.assertEqual(read_front_matter(f), {"tags": ["a", "b"]})
+            self.assertEqual(f.read(), "# Title\n")
+        write_file(path, "# Title\n")
+        with open(path) as f:
+            self.assertEqual(read_front_matter(f), {})
+            self.assertEqual(f.read(), "# Title\n")
+
+    def test_title_and_template_from_front_matter(self):
+        write_file(os.path.join(self.templates_dir, "wide.html"), "WIDE {{ Title }} {{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "---\ntitle: Front\ntemplate: wide\n---\nNo heading here")
+        cache = RenderCache(os.path.join(self.root, "render"))
+        for pipeline, page_cache in ((False, None), (False, cache), (True, cache)):
+            with redirect_stdout(StringIO()):
+                results = generate_pages_recursive(self.content, self.template, self.dest, "/",
+                                                   templates_dir=self.templates_dir, cache=page_cache,
+                                                   pipeline=pipeline)
+            self.assertEqual(read_file(os.path.join(self.dest, "index.html")),
+                             "WIDE Front <div><p>No heading here</p></div>")
+            home = [result for result in results if result.source.endswith(os.path.join("content", "index.md"))][0]
+            self.assertEqual(home.title, "Front")
+            self.assertEqual(home.metadata["template"], "wide")
+
+        # The render cache is keyed on the body, so front matter edits still hit it
+        write_file(os.path.join(self.content, "index.md"), "---\ntitle: Renamed\ntemplate: wide\n---\nNo heading here")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.dest, "/",
+                                     templates_dir=self.templates_dir, cache=cache)
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(read_file(os.path.join(self.dest, "index.html")),
+                         "WIDE Renamed <div><p>No heading here</p></div>")
+
+    def test_streamed_page_with_front_matter(self):
+        from_path = os.path.join(self.content, "index.md")
+        write_file(from_path, "---\ntags: x\n---\n# Streamed\n\nBody")
+        dest_path = os.path.join(self.dest, "index.html")
+        stream_page(from_path, CompiledTemplate(TEMPLATE), dest_path)
+        self.assertEqual(read_file(dest_path),
+                         "<html><title>Streamed</title><body><div><h1>Streamed</h1><p>Body</p></div></body></html>")
+
+    def test_drafts_are_skipped(self):
+        draft = os.path.join(self.content, "blog", "post", "index.md")
+        write_file(draft, "---\ndraft: true\n---\n# Post\n\nUnfinished")
+        self.assertEqual([md_path for md_path, _ in collect_pages(self.content, self.dest)],
+                         [os.path.join(self.content, "index.md")])
+        self.assertEqual(len(collect_pages(self.content, self.dest, drafts=True)), 2)
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post", "index.html")))
+        with redirect_stdout(StringIO()):
+            regenerated = incremental_build(self.content, self.static, self.template, self.dest, "/",
+                                            self.manifest, templates_dir=self.templates_dir,
+                                            graph_path=self.graph, drafts=True)
+        self.assertEqual(regenerated, [draft])
+
+class TestListings(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "blog", "post", "index.md"),
+                   "---\ndate: 2024-01-02\ntags: [Lore, News]\n---\n# Post\n\nA post")
+        write_file(os.path.join(self.content, "blog", "older", "index.md"),
+                   "---\ndate: 2023-06-01\ntags: lore\n---\n# Older\n\nAn older post")
+        self.site = SiteIndex()
+        self.templates = TemplateSet(self.template, "/site/", self.templates_dir)
+
+    def build_listings(self):
+        with redirect_stdout(StringIO()):
+            incremental_build(self.content, self.static, self.template, self.dest, "/site/", self.manifest,
+                              templates_dir=self.templates_dir, graph_path=self.graph, site=self.site,
+                              keep_outputs=list(self.site.listings))
+        return write_listings(self.site, self.templates, self.dest)
+
+    def test_listing_pages(self):
+        written, removed = self.build_listings()
+        self.assertEqual(self.site.pages["/blog/post"]["tags"], ["Lore", "News"])
+        self.assertEqual(self.site.pages["/blog/post"]["date"], "2024-01-02")
+        self.assertEqual(sorted(written), [os.path.join("blog", "index.html"), os.path.join("tags", "index.html"),
+                                           os.path.join("tags", "lore", "index.html"),
+                                           os.path.join("tags", "news", "index.html")])
+        lore = read_file(os.path.join(self.dest, "tags", "lore", "index.html"))
+        self.assertEqual(
+            lore,
+            '<html><title>Tagged lore</title><body><div><h1>Tagged lore</h1><ul>'
+            '<li><a href="/site/blog/post/">Post</a> <time datetime="2024-01-02">2024-01-02</time></li>'
+            '<li><a href="/site/blog/older/">Older</a> <time datetime="2023-06-01">2023-06-01</time></li>'
+            '</ul></div></body></html>',
+        )
+        self.assertIn('<a href="/site/tags/lore/">lore (2)</a>', read_file(os.path.join(self.dest, "tags", "index.html")))
+
+    def test_listings_change_only_with_their_members(self):
+        self.build_listings()
+        # A body edit changes no listing entry
+        write_file(os.path.join(self.content, "blog", "older", "index.md"),
+                   "---\ndate: 2023-06-01\ntags: lore\n---\n# Older\n\nReworded")
+        self.assertEqual(self.build_listings(), ([], []))
+        # Dropping the News tag only touches the listings it appeared in
+        write_file(os.path.join(self.content, "blog", "post", "index.md"),
+                   "---\ndate: 2024-01-02\ntags: lore\n---\n# Post\n\nA post")
+        written, removed = self.build_listings()
+        self.assertEqual(written, [os.path.join("tags", "index.html")])
+        self.assertEqual(removed, [os.path.join("tags", "news", "index.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "tags", "news")))
+
+    def test_content_pages_take_precedence(self):
+        write_file(os.path.join(self.content, "blog", "index.md"), "# My blog")
+        self.build_listings()
+        self.assertEqual(read_file(os.path.join(self.dest, "blog", "index.html")),
+                         "<html><title>My blog</title><body><div><h1>My blog</h1></div></body></html>")
+        self.assertNotIn(os.path.join("blog", "index.html"), self.site.listings)
+
+    def test_content_page_replacing_a_listing_is_kept(self):
+        self.build_listings()
+        self.assertIn(os.path.join("blog", "index.html"), self.site.listings)
+        write_file(os.path.join(self.content, "blog", "index.md"), "# My blog")
+        written, removed = self.build_listings()
+        self.assertEqual(removed, [])
+        self.assertEqual(read_file(os.path.join(self.dest, "blog", "index.html")),
+                         "<html><title>My blog</title><body><div><h1>My blog</h1></div></body></html>")
+        self.assertNotIn(os.path.join("blog", "index.html"), self.site.listings)
+        # And back: without the content page the listing returns
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        written, removed = self.build_listings()
+        self.assertEqual(written, [os.path.join("blog", "index.html")])
+        self.assertIn("<h1>Blog</h1>", read_file(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_outdated_index_rebuilds_pages(self):
+        self.build_listings()
+        path = os.path.join(self.root, "site.json")
+        write_file(path, json.dumps({"/": {"title": "Home"}}))
+        self.site = SiteIndex.load(path)
+        self.assertEqual(self.site.pages, {})
+        self.build_listings()
+        self.assertEqual(sorted(self.site.pages), ["/", "/blog/older", "/blog/post"])
+
+def png_header(width, height):
+    return b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + width.to_bytes(4, "big") + height.to_bytes(4, "big") + b"\x08\x06\x00\x00\x00"
+
+class TestImagePipeline(SiteTestCase):
+    def write_bytes(self, rel_path, data):
+        path = os.path.join(self.static, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_image_size_from_headers(self):
+        app0 = b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+        sof0 = b"\xff\xc0\x00\x11\x08" + (50).to_bytes(2, "big") + (70).to_bytes(2, "big") + b"\x03" + b"\x00" * 9
+        vp8x = b"RIFF\x00\x00\x00\x00WEBPVP8X\x0a\x00\x00\x00\x00\x00\x00\x00" + (99).to_bytes(3, "little") + (49).to_bytes(3, "little")
+        cases = {
+            "a.png": (png_header(640, 480), (640, 480)),
+            "a.gif": (b"GIF89a" + (20).to_bytes(2, "little") + (10).to_bytes(2, "little") + b"\x00" * 8, (20, 10)),
+            "a.jpg": (b"\xff\xd8" + app0 + sof0, (70, 50)),
+            "a.webp": (vp8x, (100, 50)),
+            "a.txt": (b"not an image", None),
+        }
+        for name, (data, size) in cases.items():
+            self.assertEqual(image_size(self.write_bytes(name, data)), size, name)
+
+    def test_rewrite_img_tags(self):
+        images = ImageSet("/site/")
+        images.add(os.path.join("images", "a.png"),
+                   ImageInfo("/images/a.123.png", 800, 600, [("/images/a.123-480w.png", 480), ("/images/a.123.png", 800)]))
+        html = images.rewrite('<p><img src="/images/a.png" alt="A"></img><img src="/other.png" alt="B"></img></p>')
+        self.assertEqual(
+            html,
+            '<p><img src="/images/a.123.png" alt="A" width="800" height="600" '
+            'srcset="/site/images/a.123-480w.png 480w, /site/images/a.123.png 800w" '
+            'sizes="(max-width: 800px) 100vw, 800px" loading="lazy"></img>'
+            '<img src="/other.png" alt="B"></img></p>',
+        )
+
+    def test_build_with_images(self):
+        self.write_bytes(os.path.join("images", "a.png"), png_header(300, 200))
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n![A](/images/a.png)")
+        with redirect_stdout(StringIO()):
+            images = process_images(self.static, self.dest, "/", widths=(100,),
+                                    cache_dir=os.path.join(self.root, "images"))
+            incremental_build(self.content, self.static, self.template, self.dest, "/", self.manifest,
+                              templates_dir=self.templates_dir, graph_path=self.graph,
+                              keep_outputs=images.outputs, images=images)
+        hashed = images.images["/images/a.png"].url
+        self.assertRegex(hashed, r"^/images/a\.[0-9a-f]{10}\.png$")
+        self.assertTrue(os.path.exists(os.path.join(self.dest, hashed.lstrip("/"))))
+        html = read_file(os.path.join(self.dest, "index.html"))
+        self.assertIn(f'src="{hashed}" alt="A" width="300" height="200"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_digests_reused_while_size_and_mtime_match(self):
+        path = self.write_bytes("a.png", png_header(30, 20))
+        cache_dir = os.path.join(self.root, "images")
+
+        def url():
+            with redirect_stdout(StringIO()):
+                return process_images(self.static, self.dest, "/", widths=(), cache_dir=cache_dir).images["/a.png"].url
+
+        first = url()
+        stat = os.stat(path)
+        self.write_bytes("a.png", png_header(31, 20))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        # Not read again: the cached digest still names it
+        self.assertEqual(url(), first)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertNotEqual(url(), first)
+
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_variants_are_cached(self):
+        Image.new("RGB", (400, 200)).save(os.path.join(self.static, "big.png"))
+        cache_dir = os.path.join(self.root, "images")
+        with redirect_stdout(StringIO()) as out:
+            images = process_images(self.static, self.dest, "/", widths=(100, 800), cache_dir=cache_dir)
+            process_images(self.static, self.dest, "/", widths=(100, 800), cache_dir=cache_dir)
+        self.assertEqual(out.getvalue().count("Resized image"), 1)
+        info = images.images["/big.png"]
+        self.assertEqual([width for url, width in info.srcset], [100, 400])
+
+class TestPipelinedBuild(SiteTestCase):
+    def generate(self, dest, pipeline):
+        with redirect_stdout(StringIO()):
+            return generate_pages_recursive(self.content, self.template, dest, "/",
+                                            templates_dir=self.templates_dir, pipeline=pipeline)
+
+    def test_pipeline_output_matches_serial(self):
+        write_file(os.path.join(self.content, "a", "index.md"), "# A\n\n[home](/)")
+        serial_dest = os.path.join(self.root, "serial")
+        pipeline_dest = os.path.join(self.root, "pipeline")
+        self.generate(serial_dest, False)
+        results = self.generate(pipeline_dest, True)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.changed for result in results))
+        for md_path, html_path in collect_pages(self.content, serial_dest):
+            rel = os.path.relpath(html_path, serial_dest)
+            self.assertEqual(read_file(html_path), read_file(os.path.join(pipeline_dest, rel)))
+        self.assertFalse(any(result.changed for result in self.generate(pipeline_dest, True)))
+
+    def test_pipeline_failures_are_aggregated(self):
+        write_file(os.path.join(self.content, "index.md"), "no title")
+        with self.assertRaises(BuildError) as ctx:
+            self.generate(self.dest, True)
+        self.assertEqual([path for path, error in ctx.exception.failures],
+                         [os.path.join(self.content, "index.md")])
+        self.assertEqual(len(ctx.exception.results), 1)
+
+    def test_run_pipeline_bounds_items_in_flight(self):
+        produced = []
+        processed = []
+
+        def items():
+            for i in range(50):
+                produced.append(i)
+                yield (i,)
+
+        def process(item, data):
+            # Never more than a few queues' worth ahead of the renderer
+            self.assertLessEqual(len(produced) - len(processed), 4 * 3)
+            processed.append(item)
+            return data, item[0]
+
+        results = run_pipeline(items(), lambda item: item[0] * 2, process, lambda output: None,
+                               io_threads=2, depth=3)
+        self.assertEqual(results, list(range(50)))
+
+    def test_scan_ahead_reraises(self):
+        def items():
+            yield 1
+            raise RuntimeError("walk failed")
+        with self.assertRaises(RuntimeError):
+            list(scan_ahead(items()))
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        template = CompiledTemplate('<a href="/">{{ Title }}</a>{{ Content }}', "/site/")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.segments[0], '<a href="/site/">')
+
+    def test_render(self):
+        template = CompiledTemplate("<h1>{{ Title }}</h1><main>{{ Content }}</main>")
+        self.assertEqual(template.render(Title="Hi", Content="<p>x</p>"), "<h1>Hi</h1><main><p>x</p></main>")
+
+    def test_render_missing_slot_raises(self):
+        template = CompiledTemplate("{{ Title }}")
+        with self.assertRaises(ValueError):
+            template.render(Content="x")
+
+    def test_render_to_streams_iterable_values(self):
+        template = CompiledTemplate("<h1>{{ Title }}</h1><main>{{ Content }}</main>")
+        out = StringIO()
+        template.render_to(out.write, Title="Hi", Content=iter(["<p>a</p>", "<p>b</p>"]))
+        self.assertEqual(out.getvalue(), "<h1>Hi</h1><main><p>a</p><p>b</p></main>")
+
+    def test_render_to_checks_slots_before_writing(self):
+        out = StringIO()
+        with self.assertRaises(ValueError):
+            CompiledTemplate("head {{ Title }} {{ Content }}").render_to(out.write, Title="x")
+        self.assertEqual(out.getvalue(), "")
+
+    def test_apply_basepath(self):
+        html = '<a href="/blog">x</a><img src="/a.png"><a href="https://x.y/">y</a>'
+        self.assertEqual(
+            apply_basepath(html, "/site/"),
+            '<a href="/site/blog">x</a><img src="/site/a.png"><a href="https://x.y/">y</a>',
+        )
+        self.assertIs(apply_basepath(html, "/"), html)
+
+class TestStreamPage(SiteTestCase):
+    MARKDOWN = (
+        "# Title\n\nSome [link](/blog) and ![img](/a.png)\n\n"
+        "```\ncode\n\nwith blank\n```\n\n> quote\n\n- a\n- b\n\n1. x\n2. y\n"
+    )
+
+    def test_matches_in_memory_render(self):
+        md_path = os.path.join(self.content, "index.md")
+        html_path = os.path.join(self.dest, "index.html")
+        write_file(md_path, self.MARKDOWN)
+        template = CompiledTemplate('<a href="/">{{ Title }}</a>{{ Content }}', "/site/")
+        stream_page(md_path, template, html_path)
+        self.assertEqual(read_file(html_path), render_page(self.MARKDOWN, template)[0])
+
+    def test_failed_page_keeps_previous_output(self):
+        md_path = os.path.join(self.content, "index.md")
+        html_path = os.path.join(self.dest, "index.html")
+        write_file(html_path, "old")
+        write_file(md_path, "# Title\n\n## Bad **bold\n")
+        with self.assertRaises(ValueError):
+            stream_page(md_path, CompiledTemplate(TEMPLATE), html_path)
+        self.assertEqual(os.listdir(self.dest), ["index.html"])
+        self.assertEqual(read_file(html_path), "old")
+
+    def test_memory_bounded_by_block(self):
+        md_path = os.path.join(self.content, "big", "index.md")
+        html_path = os.path.join(self.dest, "big", "index.html")
+        block = "Some **bold** and _italic_ text with a [link](/x). " * 20
+        write_file(md_path, "# Big\n\n" + "\n\n".join([block] * 500))
+        size = os.path.getsize(md_path)
+        tracemalloc.start()
+        try:
+            stream_page(md_path, CompiledTemplate(TEMPLATE), html_path)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, size // 4)
+
+class TestMinify(SiteTestCase):
+    def test_minify_html(self):
+        html = ('<!doctype html>\n<html>\n  <head>\n    <title>T</title>\n  </head>\n  <!-- note -->\n'
+                '  <body>\n    <p>a  <b>bold</b>\n  text</p>\n<pre>  keep\n  this</pre>\n  </body>\n</html>\n')
+        self.assertEqual(
+            minify_html(html),
+            '<!doctype html><html><head><title>T</title></head><body><p>a <b>bold</b> text</p>'
+            '<pre>  keep\n  this</pre></body></html>',
+        )
+
+    def test_minify_css(self):
+        css = ('/* theme */\nbody {\n  color: #fff;\n  font-family: "A  B", serif;\n}\n\n'
+               'a :hover, p > b {\n  margin: 0 auto;\n}\n')
+        self.assertEqual(minify_css(css), 'body{color:#fff;font-family:"A  B",serif}a :hover,p>b{margin:0 auto}')
+
+    def test_minified_build(self):
+        write_file(os.path.join(self.static, "index.css"), "body {\n  margin: 0;\n}\n")
+        with redirect_stdout(StringIO()):
+            incremental_build(self.content, self.static, self.template, self.dest, "/", self.manifest,
+                              templates_dir=self.templates_dir, graph_path=self.graph, minify=True)
+        html = read_file(os.path.join(self.dest, "index.html"))
+        self.assertNotIn("\n", html)
+        self.assertIn("<h1>Home</h1>", html)
+        self.assertEqual(read_file(os.path.join(self.dest, "index.css")), "body{margin:0}")
+
+        # Unchanged minified outputs are not rewritten; turning minify off rebuilds everything
+        with redirect_stdout(StringIO()):
+            regenerated = incremental_build(self.content, self.static, self.template, self.dest, "/",
+                                            self.manifest, templates_dir=self.templates_dir,
+                                            graph_path=self.graph, minify=True)
+        self.assertEqual(regenerated, [])
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(read_file(os.path.join(self.dest, "index.css")), "body {\n  margin: 0;\n}\n")
+
+class TestFingerprint(SiteTestCase):
+    def fingerprint_build(self):
+        with redirect_stdout(StringIO()):
+            assets = fingerprint_assets(self.static, self.dest, cache_path=os.path.join(self.root, "assets.json"))
+            regenerated = incremental_build(self.content, self.static, self.template, self.dest, "/",
+                                            self.manifest, templates_dir=self.templates_dir,
+                                            graph_path=self.graph, keep_outputs=assets.outputs,
+                                            assets=assets.urls)
+        return assets, sorted(os.path.relpath(path, self.content) for path in regenerated)
+
+    def test_apply_basepath_with_assets(self):
+        assets = {"/index.css": "/index.0123456789.css"}
+        html = '<link href="/index.css"><a href="/blog/">b</a><img src="/index.css?v=1">'
+        self.assertEqual(
+            apply_basepath(html, "/site/", assets),
+            '<link href="/site/index.0123456789.css"><a href="/site/blog/">b</a>'
+            '<img src="/site/index.0123456789.css?v=1">',
+        )
+
+    def test_only_pages_using_a_changed_asset_change(self):
+        write_file(self.template, '<html><link href="/index.css"><title>{{ Title }}</title>{{ Content }}</html>')
+        write_file(os.path.join(self.static, "a.png"), "a")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\n![A](/a.png)")
+        assets, regenerated = self.fingerprint_build()
+        self.assertEqual(regenerated, [os.path.join("blog", "post", "index.md"), "index.md"])
+        manifest = json.loads(read_file(os.path.join(self.dest, "asset-manifest.json")))
+        self.assertEqual(manifest, assets.urls)
+        css_url = assets.urls["/index.css"]
+        self.assertRegex(css_url, r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertTrue(os.path.exists(os.path.join(self.dest, css_url[1:])))
+        self.assertIn(f'href="{css_url}"', read_file(os.path.join(self.dest, "index.html")))
+        post = os.path.join(self.dest, "blog", "post", "index.html")
+        self.assertIn(f'src="{assets.urls["/a.png"]}"', read_file(post))
+
+        home = os.path.join(self.dest, "index.html")
+        home_mtime = os.stat(home).st_mtime_ns
+        write_file(os.path.join(self.static, "a.png"), "changed")
+        new_assets, regenerated = self.fingerprint_build()
+        self.assertEqual(regenerated, [os.path.join("blog", "post", "index.md")])
+        self.assertEqual(os.stat(home).st_mtime_ns, home_mtime)
+        self.assertIn(f'src="{new_assets.urls["/a.png"]}"', read_file(post))
+        # The old fingerprinted copy is pruned
+        self.assertFalse(os.path.exists(os.path.join(self.dest, assets.urls["/a.png"][1:])))
+
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        _, regenerated = self.fingerprint_build()
+        self.assertEqual(regenerated, [os.path.join("blog", "post", "index.md"), "index.md"])
+
+class TestPrecompress(SiteTestCase):
+    def test_precompress_dir(self):
+        big = "body { color: red; }\n" * 50
+        write_file(os.path.join(self.dest, "big.css"), big)
+        write_file(os.path.join(self.dest, "small.html"), "<p>hi</p>")
+        write_file(os.path.join(self.dest, "image.png"), "x" * (MIN_COMPRESS_SIZE * 2))
+        result = precompress_dir(self.dest)
+        self.assertIn("big.css.gz", result.written)
+        self.assertEqual(result.unchanged, 1)
+        gz_path = os.path.join(self.dest, "big.css.gz")
+        with gzip.open(gz_path, 'rt') as f:
+            self.assertEqual(f.read(), big)
+        self.assertEqual(os.stat(gz_path).st_mtime_ns, os.stat(os.path.join(self.dest, "big.css")).st_mtime_ns)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "small.html.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "image.png.gz")))
+
+        # Nothing changed: nothing is compressed again
+        self.assertEqual(precompress_dir(self.dest).written, [])
+
+        # A file shrinking below the threshold loses its siblings
+        write_file(os.path.join(self.dest, "big.css"), "b{}")
+        result = precompress_dir(self.dest)
+        self.assertIn("big.css.gz", result.removed)
+        self.assertFalse(os.path.exists(gz_path))
+
+    def test_sync_keeps_siblings_of_kept_files(self):
+        write_file(os.path.join(self.dest, "index.css.gz"), "old")
+        write_file(os.path.join(self.dest, "page.html"), "<p>")
+        write_file(os.path.join(self.dest, "page.html.gz"), "old")
+        write_file(os.path.join(self.dest, "gone.html.gz"), "old")
+        result = sync_dir(self.static, self.dest, keep=["page.html"], sibling_suffixes=(".gz", ".br"))
+        self.assertEqual(result.removed, ["gone.html.gz"])
+        result = sync_dir(self.static, self.dest, keep=["page.html"])
+        self.assertEqual(result.removed, ["index.css.gz", "page.html.gz"])
+
+class TestOutputWriter(SiteTestCase):
+    def test_new_file_written(self):
+        path = os.path.join(self.dest, "new", "index.html")
+        self.assertTrue(write_output(path, "hello"))
+        self.assertEqual(read_file(path), "hello")
+
+    def test_identical_content_left_untouched(self):
+        path = os.path.join(self.dest, "index.html")
+        write_file(path, "same bytes")
+        os.utime(path, ns=(1, 1))
+        with OutputFile(path) as out:
+            out.write("same ")
+            out.write("bytes")
+        self.assertFalse(out.changed)
+        self.assertEqual(os.stat(path).st_mtime_ns, 1)
+
+    def test_divergence_keeps_matching_prefix(self):
+        path = os.path.join(self.dest, "index.html")
+        for old, chunks in (("abcdef", ["abc", "xyz"]), ("abcdef", ["abc"]), ("abc", ["abc", "def"])):
+            write_file(path, old)
+            with OutputFile(path) as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            self.assertTrue(out.changed)
+            self.assertEqual(read_file(path), "".join(chunks))
+        self.assertEqual(os.listdir(self.dest), ["index.html"])
+
+    def test_error_keeps_previous_output(self):
+        path = os.path.join(self.dest, "index.html")
+        write_file(path, "old")
+        with self.assertRaises(RuntimeError):
+            with OutputFile(path) as out:
+                out.write("new")
+                raise RuntimeError()
+        self.assertEqual(read_file(path), "old")
+        self.assertEqual(os.listdir(self.dest), ["index.html"])
+
+    def test_rebuild_reports_only_changed_outputs(self):
+        self.build()
+        changes = OutputChanges()
+        # Re-rendered, but to the same HTML
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome\n")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nEdited")
+        write_file(os.path.join(self.static, "new.css"), "p {}")
+        with redirect_stdout(StringIO()):
+            regenerated = incremental_build(self.content, self.static, self.template, self.dest, "/",
+                                            self.manifest, templates_dir=self.templates_dir,
+                                            graph_path=self.graph, changes=changes)
+        self.assertEqual(len(regenerated), 2)
+        self.assertEqual(sorted(changes.written), [os.path.join("blog", "post", "index.html"), "new.css"])
+        self.assertEqual(changes.unchanged, 2)
+        path = os.path.join(self.root, "changes.json")
+        changes.save(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)["written"], sorted(changes.written))
+
+class TestTemplateSet(SiteTestCase):
+    def test_section_template_chosen_per_page(self):
+        templates_dir = self.templates_dir
+        write_file(os.path.join(templates_dir, "blog.html"), "BLOG {{ Title }} {{ Content }}")
+        templates = TemplateSet(self.template, "/", templates_dir)
+        self.assertEqual(templates.for_page(os.path.join("blog", "post", "index.md")).path,
+                         os.path.join(templates_dir, "blog.html"))
+        self.assertEqual(templates.for_page("index.md").path, self.template)
+        self.assertEqual(templates.for_page(os.path.join("contact", "index.md")).path, self.template)
+        self.assertIs(templates.for_page("index.md"), templates.get())
+
+    def test_named_template_change_triggers_rebuild(self):
+        templates_dir = self.templates_dir
+        self.build()
+        write_file(os.path.join(templates_dir, "blog.html"), "BLOG {{ Title }} {{ Content }}")
+        self.assertEqual(len(self.build()), 2)
+        self.assertTrue(read_file(os.path.join(self.dest, "blog", "post", "index.html")).startswith("BLOG Post"))
+
+class TestRenderCache(SiteTestCase):
+    def cache(self, **kwargs):
+        return RenderCache(os.path.join(self.root, "render"), "v1", **kwargs)
+
+    def test_render_miss_then_hit(self):
+        cache = self.cache()
+        calls = []
+        convert = lambda md: calls.append(md) or f"<p>{md}</p>"
+        self.assertEqual(cache.render("hi", convert), ("<p>hi</p>", False))
+        self.assertEqual(cache.render("hi", convert), ("<p>hi</p>", True))
+        self.assertEqual(calls, ["hi"])
+
+    def test_version_is_part_of_key(self):
+        cache = self.cache()
+        cache.put("hi", "<p>old</p>")
+        newer = RenderCache(cache.directory, "v2")
+        self.assertIsNone(newer.get("hi"))
+
+    def test_shared_dir_fills_local_store(self):
+        shared = os.path.join(self.root, "shared")
+        self.cache(shared_dir=shared).put("hi", "<p>hi</p>")
+        other = RenderCache(os.path.join(self.root, "other"), "v1", shared_dir=shared)
+        self.assertEqual(other.get("hi"), "<p>hi</p>")
+        self.assertEqual(RenderCache(other.directory, "v1").get("hi"), "<p>hi</p>")
+
+    def test_evict_removes_least_recently_used(self):
+        cache = self.cache(max_bytes=20)
+        cache.put("old", "x" * 10)
+        cache.put("new", "y" * 10)
+        old_path = cache._path(cache.directory, cache.key("old"))
+        os.utime(old_path, ns=(0, 0))
+        cache.put("newest", "z" * 10)
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get("old"))
+        self.assertIsNotNone(cache.get("newest"))
+
+    def test_build_tallies_hits_and_misses(self):
+        for jobs in (1, 2):
+            cache = self.cache()
+            with redirect_stdout(StringIO()):
+                generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=jobs,
+                                         templates_dir=self.templates_dir, cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (2, 0) if jobs == 2 else (0, 2))
+
+class TestServe(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.build()
+        self.big = os.urandom(MEMORY_LIMIT * 3)
+        with open(os.path.join(self.dest, "big.bin"), 'wb') as f:
+            f.write(self.big)
+        write_file(os.path.join(self.dest, "app.0123456789.css"), "b{}")
+        with redirect_stdout(StringIO()):
+            precompress_dir(self.dest)
+        self.server = PreviewServer(("127.0.0.1", 0), self.dest, quiet=True)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=10)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def get(self, path, **headers):
+        self.connection.request("GET", path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=100-", 100)
+
+    def test_pages_and_redirects(self):
+        response, body = self.get("/blog/post/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body.decode(), read_file(os.path.join(self.dest, "blog", "post", "index.html")))
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+        response, _ = self.get("/blog/post")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/blog/post/")
+        response, _ = self.get("/missing/")
+        self.assertEqual(response.status, 404)
+        response, _ = self.get("/../../etc/passwd")
+        self.assertEqual(response.status, 404)
+
+    def test_etag_revalidation(self):
+        response, _ = self.get("/index.css")
+        etag = response.getheader("ETag")
+        response, body = self.get("/index.css", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.build()
+        response, body = self.get("/index.css", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b"body { margin: 0 }")
+
+    def test_precompressed_siblings(self):
+        response, body = self.get("/big.bin", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), None)
+        self.assertEqual(body, self.big)
+        response, _ = self.get("/app.0123456789.css")
+        self.assertEqual(response.getheader("Cache-Control"), "public, max-age=31536000, immutable")
+
+        write_file(os.path.join(self.dest, "page.html"), "<p>hello</p>" * 100)
+        with redirect_stdout(StringIO()):
+            precompress_dir(self.dest)
+        response, body = self.get("/page.html", **{"Accept-Encoding": "gzip;q=1, br;q=0"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body).decode(), "<p>hello</p>" * 100)
+        response, body = self.get("/page.html")
+        self.assertEqual(response.getheader("Content-Encoding"), None)
+        self.assertEqual(body.decode(), "<p>hello</p>" * 100)
+
+    def test_ranges_of_large_files(self):
+        response, body = self.get("/big.bin", Range="bytes=10-19")
+        self.assertEqual(response.status, 206)
+        self.assertEqual(response.getheader("Content-Range"), f"bytes 10-19/{len(self.big)}")
+        self.assertEqual(body, self.big[10:20])
+        response, body = self.get("/big.bin", Range="bytes=-5")
+        self.assertEqual(body, self.big[-5:])
+        response, body = self.get("/big.bin", Range="bytes=0-0", **{"If-Range": '"stale"'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.big)
+        response, _ = self.get("/big.bin", Range=f"bytes={len(self.big)}-")
+        self.assertEqual(response.status, 416)
+
+    def test_load_test(self):
+        paths = site_paths(self.dest)
+        self.assertIn("/blog/post/", paths)
+        self.assertNotIn("/index.css.gz", paths)
+        summary = run_load_test(f"http://127.0.0.1:{self.server.server_address[1]}", paths,
+                                connections=2, requests=len(paths), revalidate=True)
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(summary["requests"], 2 * len(paths))
+        self.assertEqual(sum(summary["statuses"].values()), 2 * len(paths))
+
+class TestWatch(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.dest, "/", self.templates_dir)
+        with redirect_stdout(StringIO()):
+            self.watcher.full_build()
+
+    def apply(self, paths):
+        with redirect_stdout(StringIO()):
+            return self.watcher.apply_changes(paths)
+
+    def test_changed_paths(self):
+        old = {"a": (1, 1), "b": (1, 1)}
+        new = {"a": (1, 2), "c": (1, 1), "b": (1, 1)}
+        self.assertEqual(changed_paths(old, new), ["a", "c"])
+
+    def test_snapshot_sees_edits(self):
+        before = snapshot(self.watcher.watched_paths())
+        md_path = os.path.join(self.content, "index.md")
+        write_file(md_path, "# Home\n\nChanged size")
+        self.assertEqual(changed_paths(before, snapshot(self.watcher.watched_paths())), [md_path])
+
+    def test_page_edit_rerenders_only_that_page(self):
+        md_path = os.path.join(self.content, "index.md")
+        write_file(md_path, "# Home\n\nLive")
+        self.assertEqual(self.apply([md_path]), [md_path])
+        self.assertIn("Live", read_file(os.path.join(self.dest, "index.html")))
+
+    def test_template_edit_rerenders_everything(self):
+        write_file(self.template, "NEW {{ Title }} {{ Content }}")
+        self.assertEqual(len(self.apply([self.template])), 2)
+        self.assertTrue(read_file(os.path.join(self.dest, "index.html")).startswith("NEW Home"))
+
+    def test_static_edit_rerenders_pages_using_it(self):
+        md_path = os.path.join(self.content, "index.md")
+        css_path = os.path.join(self.static, "index.css")
+        write_file(md_path, "# Home\n\n[style](/index.css)")
+        self.apply([md_path])
+        write_file(css_path, "body { color: red }")
+        self.assertEqual(self.apply([css_path]), [md_path])
+
+    def test_deleted_page_and_static_removed(self):
+        md_path = os.path.join(self.content, "blog", "post", "index.md")
+        css_path = os.path.join(self.static, "index.css")
+        os.remove(md_path)
+        os.remove(css_path)
+        self.assertEqual(self.apply([md_path, css_path]), [])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_page_turned_draft_is_removed(self):
+        md_path = os.path.join(self.content, "blog", "post", "index.md")
+        write_file(md_path, "---\ndraft: true\n---\n# Post\n\nNot yet")
+        self.assertEqual(self.apply([md_path]), [])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        write_file(md_path, "---\ndraft: false\n---\n# Post\n\nPublished")
+        self.assertEqual(self.apply([md_path]), [md_path])
+        self.assertIn("Published", read_file(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_inject_reload_script(self):
+        html = inject_reload_script("<html><body><p>x</p></body></html>")
+        self.assertIn("EventSource", html)
+        self.assertTrue(html.endswith("</script></body></html>"))
+
+class TestStaticSync(SiteTestCase):
+    def test_copies_only_changed_files(self):
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+        first = sync_dir(self.static, self.dest)
+        self.assertEqual(first.copied, [os.path.join("images", "a.png"), "index.css"])
+        second = sync_dir(self.static, self.dest)
+        self.assertEqual((second.copied, second.unchanged), ([], 2))
+        write_file(os.path.join(self.static, "index.css"), "body { color: red }")
+        self.assertEqual(sync_dir(self.static, self.dest).copied, ["index.css"])
+        self.assertEqual(read_file(os.path.join(self.dest, "index.css")), "body { color: red }")
+
+    def test_orphans_removed_unless_kept(self):
+        write_file(os.path.join(self.dest, "old.css"), "x")
+        write_file(os.path.join(self.dest, "index.html"), "page")
+        result = sync_dir(self.static, self.dest, keep=["index.html"])
+        self.assertEqual(result.removed, ["old.css"])
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_hash_mode_detects_same_size_edit(self):
+        sync_dir(self.static, self.dest)
+        dst_path = os.path.join(self.dest, "index.css")
+        write_file(dst_path, "body []")
+        os.utime(dst_path, ns=(os.stat(os.path.join(self.static, "index.css")).st_mtime_ns,) * 2)
+        self.assertEqual(sync_dir(self.static, self.dest).copied, [])
+        self.assertEqual(sync_dir(self.static, self.dest, use_hash=True).copied, ["index.css"])
+
+    def test_link_mode_hardlinks(self):
+        sync_dir(self.static, self.dest, link=True)
+        src_stat = os.stat(os.path.join(self.static, "index.css"))
+        dst_stat = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(src_stat.st_ino, dst_stat.st_ino)
+
+class TestBenchmark(unittest.TestCase):
+    def test_generated_markdown_is_deterministic_and_renders(self):
+        md = generate_markdown(random.Random(3), 3000, markup_density=0.3)
+        self.assertEqual(md, generate_markdown(random.Random(3), 3000, markup_density=0.3))
+        self.assertGreaterEqual(len(md), 3000)
+        html = markdown_to_html_node(md).to_html()
+        self.assertIn("<h1>", html)
+
+    def test_block_mix_controls_block_types(self):
+        md = generate_markdown(random.Random(0), 2000, {"code": 1})
+        types = {block_type for block_type, _ in iter_blocks(md)}
+        self.assertEqual(types, {BlockType.HEADING, BlockType.CODE})
+
+    def test_write_corpus(self):
+        with tempfile.TemporaryDirectory() as root:
+            total = write_corpus(root, 12, 500)
+            self.assertEqual(len(collect_pages(root, "docs")), 12)
+            self.assertGreater(total, 12 * 500)
+
+    def test_results_are_json(self):
+        results = micro_benchmarks(1000, None, 0.1, 1) + macro_benchmarks(3, 500, None, 0.1, 1, [1])
+        names = [r["name"] for r in json.loads(json.dumps(results))]
+        self.assertEqual(names, ["iter_blocks", "text_to_textnodes", "text_to_textnodes_plain", "markdown_to_html_node",
+                                 "to_html", "build_jobs_1"])
+
+class TestProfiling(SiteTestCase):
+    def test_nested_stages_record_exclusive_time(self):
+        page = begin_page("p.md")
+        try:
+            with stage("outer"):
+                with stage("inner"):
+                    pass
+                with stage("inner"):
+                    pass
+        finally:
+            end_page()
+        self.assertEqual(page.stages["inner"][2], 2)
+        self.assertEqual(page.stages["outer"][2], 1)
+        self.assertEqual([event[0] for event in page.events], ["inner", "inner", "outer"])
+        self.assertGreaterEqual(page.wall, page.stages["outer"][0] + page.stages["inner"][0])
+
+    def test_stage_is_noop_without_profile(self):
+        with stage("anything") as s:
+            self.assertIsNotNone(s)
+
+    def test_build_profile_report_and_trace(self):
+        for jobs in (1, 2):
+            profiler = BuildProfiler()
+            with redirect_stdout(StringIO()):
+                generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=jobs,
+                                         templates_dir=self.templates_dir, profiler=profiler)
+            self.assertEqual(len(profiler.pages), 2)
+            stages = profiler.stage_totals()
+            for name in ("read", "blocks", "block_to_html", "inline", "to_html", "template", "write"):
+                self.assertIn(name, stages)
+            self.assertGreater(profiler.pages[0].bytes_out, profiler.pages[0].bytes_in)
+            report = profiler.report(top=1)
+            self.assertIn("Slowest 1 page(s)", report)
+            trace = json.loads(json.dumps(profiler.chrome_trace()))
+            self.assertEqual(sum(1 for e in trace["traceEvents"] if e["cat"] == "page"), 2)
+
+class TestReferenceIndex(SiteTestCase):
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "/")
+        self.assertEqual(page_url(os.path.join("blog", "tom", "index.html")), "/blog/tom")
+
+    def test_resolve_target(self):
+        self.assertEqual(resolve_target("/blog/tom", "/images/a.png"), "/images/a.png")
+        self.assertEqual(resolve_target("/blog/tom", "../majesty/"), "/blog/majesty")
+        self.assertEqual(resolve_target("/blog/tom", "/contact#form"), "/contact")
+        self.assertIsNone(resolve_target("/", "https://example.com/x"))
+        self.assertIsNone(resolve_target("/", "#top"))
+
+    def build_with_index(self, references, cache=None):
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.dest, "/",
+                                     templates_dir=self.templates_dir, cache=cache,
+                                     references=references)
+
+    def test_broken_references_and_asset_users(self):
+        write_file(os.path.join(self.content, "index.md"),
+                   "# Home\n\n[post](/blog/post) [gone](/nowhere) ![css](/index.css) ![x](/images/x.png)")
+        references = ReferenceIndex()
+        self.build_with_index(references)
+        self.assertEqual(references.pages["/"]["links"], ["/blog/post", "/nowhere"])
+        self.assertEqual(
+            references.broken_references(["index.css"]),
+            [("/", "/images/x.png"), ("/", "/nowhere")],
+        )
+        self.assertEqual(references.pages_using("/index.css"), ["/"])
+
+    def test_generated_outputs_are_not_broken(self):
+        write_file(os.path.join(self.content, "index.md"),
+                   "# Home\n\n[lore](/tags/lore/) [blog](/blog/) [feed](/feed.xml) [gone](/nowhere)")
+        references = ReferenceIndex()
+        self.build_with_index(references)
+        generated = [os.path.join("tags", "lore", "index.html"), os.path.join("blog", "index.html"), "feed.xml"]
+        self.assertEqual(references.broken_references([], generated), [("/", "/nowhere")])
+
+    def test_cache_hits_still_index_references(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        cache = RenderCache(os.path.join(self.root, "render"), "v1")
+        self.build_with_index(ReferenceIndex(), cache)
+        references = ReferenceIndex()
+        self.build_with_index(references, cache)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(references.pages["/"]["links"], ["/blog/post"])
+
+    def test_incremental_build_keeps_and_prunes_entries(self):
+        references = ReferenceIndex()
+        with redirect_stdout(StringIO()):
+            incremental_build(self.content, self.static, self.template, self.dest, "/", self.manifest,
+                              templates_dir=self.templates_dir, references=references,
+                              graph_path=self.graph)
+            os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+            incremental_build(self.content, self.static, self.template, self.dest, "/", self.manifest,
+                              templates_dir=self.templates_dir, references=references,
+                              graph_path=self.graph)
+        self.assertEqual(list(references.pages), ["/"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,15 @@
 import unittest
 from textnode import TextNode, TextType
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, write_html
+from io import StringIO
 from textnode_to_htmlnode import text_node_to_html_node
 from split_nodes_delimiter import split_nodes_delimiter
 from extract_markdown import extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_link, text_to_textnodes
 from markdown_to_blocks import markdown_to_blocks
+from block_parser import iter_blocks
 from block_types import BlockType, block_to_block_type
 from markdown_to_html import markdown_to_html_node, extract_title
+from inline_scanner import is_plain_text, scan_inline
 
 class TestTextNode(unittest.TestCase):
     def test_eq(self):
@@ -24,6 +27,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("Same Text", TextType.ITALIC)
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("text", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
     def test_eq_with_url_none(self):
         node = TextNode("Link Text", TextType.LINK, None)
         node2 = TextNode("Link Text", TextType.LINK, None)
@@ -38,6 +47,12 @@ class TestLeafNode(unittest.TestCase):
         node = LeafNode("a", "Click me!", {"href": "https://www.google.com"})
         self.assertEqual(node.to_html(), '<a href="https://www.google.com">Click me!</a>')
 
+    def test_leaf_node_attributes(self):
+        node = LeafNode("a", "x", {"href": "/"})
+        self.assertEqual((node.tag, node.value, node.children, node.props), ("a", "x", None, {"href": "/"}))
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertFalse(hasattr(ParentNode("p", [node]), "__dict__"))
+
     def test_leaf_to_html_no_tag(self):
         node = LeafNode(None, "Raw text")
         self.assertEqual(node.to_html(), "Raw text")
@@ -83,6 +98,26 @@ class TestParentNode(unittest.TestCase):
         parent_node = ParentNode("p", children)
         self.assertEqual(parent_node.to_html(), "<p><b>Bold text</b>Normal text<i>italic text</i></p>")
 
+    def test_to_html_deep_nesting(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "<b>deep</b>"))
+        self.assertTrue(html.endswith("</span>" * 5000))
+
+    def test_write_html_to_stream(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a"), LeafNode("i", "b")]), LeafNode("hr", "")])
+        out = StringIO()
+        write_html(node, out.write)
+        self.assertEqual(out.getvalue(), node.to_html())
+        self.assertEqual(out.getvalue(), "<div><p>a<i>b</i></p><hr></hr></div>")
+
+    def test_nested_child_without_children_raises_error(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
 class TestTextNodeToHTMLNode(unittest.TestCase):
     def test_text(self):
         node = TextNode("This is a text node", TextType.TEXT)
@@ -269,6 +304,56 @@ class TestSplitNodesImageLink(unittest.TestCase):
         nodes = text_to_textnodes(text)
         self.assertListEqual([], nodes)
 
+class TestScanInline(unittest.TestCase):
+    def test_bold_inside_link(self):
+        nodes = text_to_textnodes("see [the **best** post](/blog) now")
+        self.assertEqual(len(nodes), 3)
+        link = nodes[1]
+        self.assertEqual(link.text, "the **best** post")
+        self.assertEqual(link.url, "/blog")
+        self.assertListEqual(
+            [
+                TextNode("the ", TextType.TEXT),
+                TextNode("best", TextType.BOLD),
+                TextNode(" post", TextType.TEXT),
+            ],
+            link.children,
+        )
+        html = ParentNode("p", [text_node_to_html_node(n) for n in nodes]).to_html()
+        self.assertEqual(html, '<p>see <a href="/blog">the <b>best</b> post</a> now</p>')
+
+    def test_italic_inside_bold(self):
+        nodes = text_to_textnodes("**a _b_ c**")
+        self.assertEqual(text_node_to_html_node(nodes[0]).to_html(), "<b>a <i>b</i> c</b>")
+
+    def test_code_span_is_literal(self):
+        nodes = text_to_textnodes("run `my_var ** 2` here")
+        self.assertListEqual(
+            [
+                TextNode("run ", TextType.TEXT),
+                TextNode("my_var ** 2", TextType.CODE),
+                TextNode(" here", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_lone_markup_characters_are_text(self):
+        nodes = text_to_textnodes("a * b ! c [d] e")
+        self.assertListEqual([TextNode("a * b ! c [d] e", TextType.TEXT)], nodes)
+
+    def test_unmatched_delimiter_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("this is **unclosed")
+
+    def test_is_plain_text(self):
+        self.assertTrue(is_plain_text("plain prose, with * and ! and (parens)"))
+        for text in ("a ![b](c)", "a [b](c)", "a **b**", "a _b_", "a `b`", "a [b]"):
+            self.assertFalse(is_plain_text(text), text)
+
+    def test_plain_text_fast_path_matches_scanner(self):
+        for text in ("plain", "a * b ! c", "x*y!z", "ends with !"):
+            self.assertListEqual(scan_inline(text), text_to_textnodes(text))
+
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
         md = """
@@ -316,6 +401,43 @@ Paragraph three
         blocks = markdown_to_blocks(md)
         self.assertEqual(blocks, [])
 
+class TestIterBlocks(unittest.TestCase):
+    def test_code_block_with_blank_lines(self):
+        md = "Intro\n\n```\ndef f():\n\n    return 1\n```\n\nAfter"
+        self.assertEqual(
+            list(iter_blocks(md)),
+            [
+                (BlockType.PARAGRAPH, ["Intro"]),
+                (BlockType.CODE, ["```", "def f():", "", "    return 1", "```"]),
+                (BlockType.PARAGRAPH, ["After"]),
+            ],
+        )
+
+    def test_types_match_block_to_block_type(self):
+        md = "# Title\n\n> a\n> b\n\n- x\n- y\n\n1. one\n2. two\n\n1. one\n3. three\n\nplain"
+        blocks = list(iter_blocks(md))
+        self.assertEqual(
+            [block_type for block_type, _ in blocks],
+            [block_to_block_type("\n".join(lines)) for _, lines in blocks],
+        )
+
+    def test_reads_file_iterator_lazily(self):
+        lines = iter(["# Title\n", "\n", "para\n", "\n"])
+        blocks = iter_blocks(lines)
+        self.assertEqual(next(blocks), (BlockType.HEADING, ["# Title"]))
+        self.assertEqual(next(lines), "para\n")
+
+    def test_markdown_to_html_with_fenced_blank_lines(self):
+        node = markdown_to_html_node(iter(["```\n", "a\n", "\n", "b\n", "```\n"]))
+        self.assertEqual(node.to_html(), "<div><pre><code>a\n\nb\n</code></pre></div>")
+
+    def test_trailing_list_marker_is_not_an_empty_item(self):
+        node = markdown_to_html_node("# T\n\n- one\n- ")
+        self.assertEqual(node.to_html(), "<div><h1>T</h1><p>- one -</p></div>")
+
+    def test_trailing_number_is_not_an_ordered_item(self):
+        self.assertEqual(list(iter_blocks("1. a\n2. ")), [(BlockType.PARAGRAPH, ["1. a", "2."])])
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_heading(self):
         block = "# Heading"
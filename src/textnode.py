@@ -9,16 +9,21 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(self, text, text_type, url=None, children=None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        # Nested inline nodes for bold/italic/link text that contains markup
+        self.children = children
 
     def __eq__(self, other):
         if not isinstance(other, TextNode):
             return False
         return (self.text == other.text and
                 self.text_type == other.text_type and
-                self.url == other.url)
+                self.url == other.url and
+                self.children == other.children)
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
@@ -1,9 +1,11 @@
 from textnode import TextNode, TextType
-from htmlnode import LeafNode
+from htmlnode import LeafNode, ParentNode
 
 def text_node_to_html_node(text_node):
     if not isinstance(text_node, TextNode):
         raise ValueError("Input must be a TextNode")
+    if text_node.children:
+        return nested_text_node_to_html_node(text_node)
     if text_node.text_type == TextType.TEXT:
         return LeafNode(None, text_node.text)
     if text_node.text_type == TextType.BOLD:
@@ -16,4 +18,14 @@ def text_node_to_html_node(text_node):
         return LeafNode("a", text_node.text, {"href": text_node.url})
     if text_node.text_type == TextType.IMAGE:
         return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-    raise ValueError(f"Unknown TextType: {text_node.text_type}")
\ No newline at end of file
+    raise ValueError(f"Unknown TextType: {text_node.text_type}")
+
+def nested_text_node_to_html_node(text_node):
+    children = [text_node_to_html_node(child) for child in text_node.children]
+    if text_node.text_type == TextType.BOLD:
+        return ParentNode("b", children)
+    if text_node.text_type == TextType.ITALIC:
+        return ParentNode("i", children)
+    if text_node.text_type == TextType.LINK:
+        return ParentNode("a", children, {"href": text_node.url})
+    raise ValueError(f"TextType {text_node.text_type} cannot have children")
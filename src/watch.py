@@ -0,0 +1,269 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from compiled_template import TemplateSet
+from build_manifest import remove_file_and_empty_parents
+from parallel_build import BuildError
+from static_sync import sync_file
+from dependency_graph import DependencyGraph
+from block_memo import DEFAULT_MEMO_ENTRIES
+from main import collect_pages, is_draft, record_dependencies, sync_static, write_pages
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + RELOAD_PATH + "\")"
+    ".onmessage = function () { location.reload(); };</script>"
+)
+
+def snapshot(paths):
+    """
+    Map every file under paths (files or directories) to its (size, mtime).
+    Missing paths are skipped.
+    """
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            st = os.stat(path)
+            files[path] = (st.st_size, st.st_mtime_ns)
+            continue
+        for root, dirs, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                files[file_path] = (st.st_size, st.st_mtime_ns)
+    return files
+
+def changed_paths(old, new):
+    """
+    Paths added, removed or modified between two snapshots, sorted.
+    """
+    changed = {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+    return sorted(changed)
+
+def inject_reload_script(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + RELOAD_SCRIPT
+    return html[:index] + RELOAD_SCRIPT + html[index:]
+
+def _is_under(path, directory):
+    return bool(directory) and os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+
+class ReloadBroadcaster:
+    """
+    Wakes every connected live-reload client when the site is rebuilt.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self):
+        with self._condition:
+            self.generation += 1
+            self._condition.notify_all()
+
+    def wait(self, seen, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self.generation != seen, timeout)
+            return self.generation
+
+class SiteWatcher:
+    """
+    Keeps the compiled templates and the dependency graph in memory and
+    applies filesystem changes to the output directory, re-rendering only the
+    pages that depend on what changed.
+    """
+
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, basepath="/",
+                 templates_dir="templates"):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.templates_dir = templates_dir
+        self.templates = TemplateSet(template_path, basepath, templates_dir)
+        self.template_sources = set(self.templates.source_paths())
+        self.graph = DependencyGraph(basepath)
+
+    def watched_paths(self):
+        return [self.content_dir, self.static_dir, self.template_path, self.templates_dir]
+
+    def full_build(self):
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        sync_static(self.static_dir, self.dest_dir, pages)
+        self.render(pages)
+
+    def render(self, pages):
+        results = write_pages(pages, self.content_dir, self.templates, memo_size=DEFAULT_MEMO_ENTRIES)
+        record_dependencies(self.graph, results, self.dest_dir, self.static_dir)
+
+    def output_path(self, md_path):
+        rel_dir = os.path.relpath(os.path.dirname(md_path), self.content_dir)
+        return os.path.normpath(os.path.join(self.dest_dir, rel_dir, "index.html"))
+
+    def source_path(self, rel_html):
+        return os.path.normpath(os.path.join(self.content_dir, os.path.dirname(rel_html), "index.md"))
+
+    def is_published(self, md_path):
+        """
+        Whether md_path exists and is not a draft, as collect_pages decides.
+        """
+        return os.path.exists(md_path) and not is_draft(md_path)
+
+    def apply_changes(self, paths):
+        """
+        Bring the output up to date with the changed source paths.
+        Returns the markdown paths that were re-rendered.
+        """
+        templates_added_or_removed = False
+        template_changed = False
+        changed_inputs = []
+        pages = {}
+        for path in paths:
+            if path == self.template_path or _is_under(path, self.templates_dir):
+                template_changed = True
+                if path in self.template_sources and os.path.exists(path):
+                    changed_inputs.append(path)
+                else:
+                    # Which template a section uses may have changed
+                    templates_added_or_removed = True
+            elif _is_under(path, self.content_dir):
+                if os.path.basename(path) != "index.md":
+                    continue
+                if self.is_published(path):
+                    pages[path] = self.output_path(path)
+                else:
+                    # Deleted, or turned into a draft
+                    output = self.output_path(path)
+                    self.graph.remove_output(os.path.relpath(output, self.dest_dir))
+                    if os.path.exists(output):
+                        remove_file_and_empty_parents(output, self.dest_dir)
+                        print(f"Removed page: {output}")
+            elif _is_under(path, self.static_dir):
+                dst_path = os.path.join(self.dest_dir, os.path.relpath(path, self.static_dir))
+                if os.path.exists(path):
+                    sync_file(path, dst_path)
+                    print(f"Copied file: {path} to {dst_path}")
+                else:
+                    remove_file_and_empty_parents(dst_path, self.dest_dir)
+                    print(f"Removed file: {dst_path}")
+                changed_inputs.append(path)
+
+        if template_changed:
+            self.templates = TemplateSet(self.template_path, self.basepath, self.templates_dir)
+            self.template_sources = set(self.templates.source_paths())
+        if templates_added_or_removed:
+            pages = dict(collect_pages(self.content_dir, self.dest_dir))
+        for rel_html in self.graph.affected(changed_inputs):
+            source = self.source_path(rel_html)
+            if self.is_published(source):
+                pages[source] = os.path.join(self.dest_dir, rel_html)
+        pages = sorted(pages.items())
+        self.render(pages)
+        return [md_path for md_path, html_path in pages]
+
+    def poll_forever(self, broadcaster, interval=0.5, debounce=0.2):
+        previous = snapshot(self.watched_paths())
+        while True:
+            time.sleep(interval)
+            current = snapshot(self.watched_paths())
+            if current == previous:
+                continue
+            # Wait for a burst of saves to settle before rebuilding
+            while True:
+                time.sleep(debounce)
+                settled = snapshot(self.watched_paths())
+                if settled == current:
+                    break
+                current = settled
+            paths = changed_paths(previous, current)
+            previous = current
+            try:
+                self.apply_changes(paths)
+            except (BuildError, OSError, ValueError) as e:
+                print(f"Rebuild failed: {e}", file=sys.stderr)
+                continue
+            broadcaster.notify()
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the output directory without caching, injects the live-reload
+    script into HTML pages and streams reload events at RELOAD_PATH.
+    """
+
+    broadcaster = None
+
+    def end_headers(self):
+        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.stream_reload_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?")[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not (path.endswith(".html") and os.path.isfile(path)):
+            super().do_GET()
+            return
+        with open(path, 'r') as f:
+            body = inject_reload_script(f.read()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        seen = self.broadcaster.generation
+        try:
+            while True:
+                generation = self.broadcaster.wait(seen, timeout=15)
+                if generation == seen:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    seen = generation
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Rebuild docs/ on change and live-reload the browser")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix for href/src attributes")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between filesystem polls")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    dest_dir = "docs"
+    watcher = SiteWatcher("content", "static", "template.html", dest_dir, args.basepath)
+    watcher.full_build()
+
+    broadcaster = ReloadBroadcaster()
+    handler = type("Handler", (LiveReloadHandler,), {"broadcaster": broadcaster})
+    server = ThreadingHTTPServer(("", args.port), partial(handler, directory=dest_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Watching content/, static/ and templates; serving http://localhost:{args.port}")
+    print("Press Ctrl+C to stop")
+    try:
+        watcher.poll_forever(broadcaster, args.interval)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()